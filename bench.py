@@ -0,0 +1,521 @@
+import argparse
+import heapq
+import json
+import math
+import sys
+import time
+import types
+
+from collector import SystemSampler
+from sources import (
+    PRESSURE_RESOURCES, SOURCES, CpuTimes, DiskIO, MetricSource, NetIO, Sensors, Temperature, benchmark, create_source,
+)
+
+# Results layout version; bump it when a key is renamed so old baselines fail loudly
+RESULTS_VERSION = 1
+
+# Seconds of synthetic time between samples, same as the widget's monitor thread
+SAMPLE_INTERVAL = 3.0
+# Virtual seconds the wakeup count runs for, long enough for every phase of the scenario
+WAKEUP_SECONDS = 360
+# A benchmark whose p50 grows by more than this against --baseline is a regression
+DEFAULT_TOLERANCE = 0.25
+# Cold starts timed per run (median reported), and the budget from launching
+# the interpreter to the first reading on screen; going over it is a regression
+STARTUP_RUNS = 5
+STARTUP_TARGET_MS = 250
+
+# What a hotkey launch does, timed from inside a fresh interpreter
+STARTUP_SCRIPT = '''
+import json, sys, time
+started = time.time()
+import pc
+imported = time.time()
+if sys.argv[1] == 'fake':
+    import bench
+    pc.tk = bench.FAKE_TK
+app = pc.ComputerMoodDetector(defer_startup=True)
+if sys.argv[1] != 'fake':
+    app.root.update()
+shell = time.time()
+app.finish_startup()
+if sys.argv[1] != 'fake':
+    app.root.update()
+first_sample = time.time()
+print(json.dumps({'started': started, 'imported': imported, 'shell': shell, 'first_sample': first_sample}))
+'''
+
+
+class SyntheticSource(MetricSource):
+    # Deterministic scenario for benchmarks: a calm baseline with a CPU spike
+    # every two minutes, RAM that creeps up to ~95% over six minutes before
+    # being released, a battery draining off the charger, and tasks stalling
+    # whenever CPU, RAM or disk goes past 80%; the package heats up with the
+    # CPU and clocks down during spikes. Counters only
+    # move when step() is called, and `clock` follows the same virtual time,
+    # so every run sees exactly the same readings no matter how fast the
+    # machine is. Set `interval` between steps to sample at a different rate.
+    name = 'synthetic'
+
+    def __init__(self, cores=4, interval=SAMPLE_INTERVAL):
+        self.cores = cores
+        self.interval = interval
+        self.elapsed = 0.0
+        self.now = time.monotonic()
+        self.times = [[0.0] * len(CpuTimes._fields) for _ in range(cores)]
+        self.net = [0] * len(NetIO._fields)
+        self.disk = [0] * len(DiskIO._fields)
+        self.stalls = {resource: [0, 0] for resource in PRESSURE_RESOURCES}
+
+    def clock(self):
+        return self.now
+
+    def scenario(self, elapsed):
+        # (cpu %, ram %, network MB/s, disk busy %, battery %) at `elapsed` seconds
+        cpu = 15 + 10 * math.sin(elapsed / 21)
+        if elapsed % 120 >= 102:
+            cpu = 97.0
+        ram = 45 + 50 * (elapsed % 360) / 360
+        network = 3 + 2 * math.sin(elapsed / 15)
+        disk = 20 + 70 * (elapsed % 180 >= 150)
+        battery = max(100 - (elapsed % 1200) / 12, 2.0)
+        return cpu, ram, network, disk, battery
+
+    def step(self):
+        self.elapsed += self.interval
+        self.now += self.interval
+        cpu, ram, network, disk, _ = self.scenario(self.elapsed)
+        busy = cpu / 100 * self.interval
+        for core in self.times:
+            core[0] += busy * 0.8  # user
+            core[2] += busy * 0.2  # system
+            core[3] += self.interval - busy  # idle
+        received = int(network * 1024 * 1024 * self.interval)
+        self.net[0] += received // 20
+        self.net[1] += received
+        self.net[2] += received // 1500 // 20
+        self.net[3] += received // 1500
+        operations = int(disk * 10 * self.interval)
+        self.disk[0] += operations
+        self.disk[1] += operations // 2
+        self.disk[2] += operations * 4096
+        self.disk[3] += operations * 2048
+        self.disk[4] += operations // 2
+        self.disk[5] += operations // 4
+        self.disk[6] += int(disk / 100 * self.interval * 1000)
+        # Tasks start stalling once a resource is nearly exhausted
+        window = self.interval * 1_000_000
+        for resource, load in (('cpu', cpu), ('memory', ram), ('io', disk)):
+            stalled = max(load - 80, 0) / 20 * 0.5 * window
+            self.stalls[resource][0] += int(stalled)
+            self.stalls[resource][1] += int(stalled / 4)
+
+    def cpu_times(self):
+        return [CpuTimes(*core) for core in self.times]
+
+    def memory_percent(self):
+        return self.scenario(self.elapsed)[1]
+
+    def net_io(self):
+        return {'eth0': NetIO(*self.net)}
+
+    def disk_io(self):
+        return {'sda': DiskIO(*self.disk)}
+
+    def battery(self):
+        return self.scenario(self.elapsed)[4], False
+
+    def pressure_files(self):
+        return {}
+
+    def pressure(self):
+        return {resource: tuple(totals) for resource, totals in self.stalls.items()}
+
+    def sensors(self):
+        cpu = self.scenario(self.elapsed)[0]
+        temperature = 40 + cpu / 2
+        # Past 85 °C the package drops to 60% of its top clock
+        clock = 1800.0 if temperature > 85 else 3000.0
+        return Sensors(
+            [Temperature('Package id 0', temperature, 80.0, 100.0)],
+            [('fan1', int(1200 + cpu * 30))],
+            [(clock, 3000.0)] * self.cores,
+            None,
+        )
+
+
+class VirtualClock:
+    # Stands in for Tk's timer queue: `after` callbacks are kept in a heap and
+    # fired in virtual time, so a two minute run finishes instantly and the
+    # number of wakeups doesn't depend on how loaded the machine is.
+    def __init__(self):
+        self.now = 0  # ms
+        self.queue = []
+        self.next_id = 0
+        self.fired = {}
+
+    def after(self, ms, func=None, *args):
+        self.next_id += 1
+        timer = f"after#{self.next_id}"
+        heapq.heappush(self.queue, (self.now + ms, self.next_id, timer, func, args))
+        return timer
+
+    def after_cancel(self, timer):
+        for i, entry in enumerate(self.queue):
+            if entry[2] == timer:
+                self.queue[i] = self.queue[-1]
+                self.queue.pop()
+                heapq.heapify(self.queue)
+                return
+
+    def run_until(self, ms):
+        while self.queue and self.queue[0][0] <= ms:
+            due, _, timer, func, args = heapq.heappop(self.queue)
+            self.now = due
+            name = getattr(func, '__name__', 'callback')
+            self.fired[name] = self.fired.get(name, 0) + 1
+            func(*args)
+        self.now = ms
+
+
+class FakeWidget:
+    # Accepts any widget call and just counts it. Only the methods whose
+    # return value the UI uses are spelt out.
+    calls = 0
+
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.items = 0
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            FakeWidget.calls += 1
+        return call
+
+    def create_item(self, *args, **kwargs):
+        FakeWidget.calls += 1
+        self.items += 1
+        return self.items
+
+    create_rectangle = create_line = create_arc = create_oval = create_text = create_item
+
+    def winfo_width(self):
+        FakeWidget.calls += 1
+        return 150
+
+    def winfo_height(self):
+        FakeWidget.calls += 1
+        return 6
+
+    def winfo_screenwidth(self):
+        return 1920
+
+    def winfo_screenheight(self):
+        return 1080
+
+
+class FakeRoot(FakeWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.clock = VirtualClock()
+
+    def after(self, ms, func=None, *args):
+        FakeWidget.calls += 1
+        return self.clock.after(ms, func, *args)
+
+    def after_cancel(self, timer):
+        FakeWidget.calls += 1
+        self.clock.after_cancel(timer)
+
+
+class FakeStringVar:
+    def __init__(self, master=None, value=''):
+        self.value = value
+
+    def set(self, value):
+        FakeWidget.calls += 1
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+# Drop-in for the tkinter module as far as pc.py is concerned
+FAKE_TK = types.SimpleNamespace(
+    Tk=FakeRoot, Frame=FakeWidget, Label=FakeWidget, Canvas=FakeWidget, StringVar=FakeStringVar
+)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(call, rounds, count_calls=False):
+    # Latency from one untraced pass, allocations from a second traced one
+    # (tracemalloc slows everything down, so the two can't share a pass)
+    call(0)
+    durations = []
+    tk_calls = 0
+    for i in range(rounds):
+        before = FakeWidget.calls
+        started = time.perf_counter_ns()
+        call(i)
+        durations.append(time.perf_counter_ns() - started)
+        tk_calls += FakeWidget.calls - before
+    durations.sort()
+
+    # Imported here rather than at the top: pc.py loads this module for its
+    # command line on every start, and the widget shouldn't pay for these
+    import tracemalloc
+    alloc_rounds = max(1, rounds // 10)
+    allocated = retained = 0
+    tracemalloc.start()
+    for i in range(alloc_rounds):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call(i)
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += peak - base
+        retained += current - base
+    tracemalloc.stop()
+
+    result = {
+        'rounds': rounds,
+        'p50_us': round(percentile(durations, 0.50) / 1000, 2),
+        'p99_us': round(percentile(durations, 0.99) / 1000, 2),
+        'mean_us': round(sum(durations) / rounds / 1000, 2),
+        'alloc_bytes': round(allocated / alloc_rounds),
+        'retained_bytes': round(retained / alloc_rounds),
+    }
+    if count_calls:
+        result['tk_calls'] = round(tk_calls / rounds, 1)
+    return result
+
+
+def synthetic_readings(count):
+    # The scenario as the sampler sees it, so render benchmarks get realistic input
+    source = SyntheticSource()
+    # Serial so a deadline missed on a loaded box can't change the input
+    sampler = SystemSampler(source=source, clock=source.clock, concurrent=False)
+    readings = []
+    for _ in range(count):
+        source.step()
+        readings.append((source.now, sampler.get_system_stats()))
+    return readings
+
+
+def bench_sampler(rounds):
+    # Probes on their workers, and back to back on one thread for comparison
+    results = {}
+    for name, concurrent in (('sampler.get_system_stats', True), ('sampler.get_system_stats.serial', False)):
+        source = SyntheticSource()
+        sampler = SystemSampler(source=source, clock=source.clock, concurrent=concurrent)
+
+        def call(i):
+            source.step()
+            sampler.get_system_stats()
+        results[name] = measure(call, rounds)
+        sampler.close()
+    return results
+
+
+def build_app(real_tk):
+    import pc
+    if real_tk:
+        pc.load_tk()
+        app = pc.ComputerMoodDetector(monitor=False)
+        app.root.update()
+        return app, app.root.update_idletasks
+    saved = pc.tk
+    pc.tk = FAKE_TK
+    try:
+        app = pc.ComputerMoodDetector(monitor=False)
+    finally:
+        pc.tk = saved
+    return app, lambda: None
+
+
+def bench_render(rounds, real_tk):
+    readings = synthetic_readings(rounds)
+    app, flush = build_app(real_tk)
+    count_calls = not real_tk
+    results = {}
+
+    def update_display(i):
+        timestamp, stats = readings[i % len(readings)]
+        app.update_display(*stats, timestamp=timestamp)
+        flush()
+    results['render.update_display'] = measure(update_display, rounds, count_calls)
+
+    def update_progress_bar(i):
+        app.update_progress_bar('cpu', readings[i % len(readings)][1][0])
+        app.renderer.flush()
+        flush()
+    results['render.update_progress_bar'] = measure(update_progress_bar, rounds, count_calls)
+
+    # A frame with everything animating: two pulsing bars, shaking emoji, spinning loader
+    app.render_stats(97.0, 95.0, 50.0, 10.0, 10.0, 40.0)
+
+    def frame(i):
+        if i % 20 == 0:
+            app.spin_loader()
+        app.scheduler.tick()
+        app.scheduler.stop_timer()
+        flush()
+    results['render.frame'] = measure(frame, rounds, count_calls)
+
+    if real_tk:
+        app.root.destroy()
+    return results
+
+
+def count_wakeups(seconds=WAKEUP_SECONDS):
+    # Every timer the UI would fire over `seconds` of the synthetic scenario,
+    # with samples landing as often as the widget's adaptive pacer asks for
+    app, _ = build_app(False)
+    clock = app.root.clock
+    source = SyntheticSource()
+    sampler = SystemSampler(source=source, clock=source.clock, concurrent=False)
+    while clock.now < seconds * 1000:
+        source.step()
+        stats = sampler.get_system_stats()
+        clock.after(0, app.update_display, *stats, source.now)
+        source.interval = app.pacer.next_interval(stats)
+        clock.run_until(clock.now + int(source.interval * 1000))
+    fired = sum(clock.fired.values())
+    return {
+        'seconds': seconds,
+        'per_second': round(fired / seconds, 2),
+        'samples_per_second': round(clock.fired.get('update_display', 0) / seconds, 2),
+        'by_callback': dict(sorted(clock.fired.items())),
+    }
+
+
+def import_times(report):
+    # -X importtime lines: "import time: self_us | cumulative_us | name"
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def cold_start(real_tk):
+    import os
+    import subprocess
+    launched = time.time()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT, 'tk' if real_tk else 'fake'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=60,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"startup benchmark failed: {process.stderr.strip().splitlines()[-1:]}")
+    marks = json.loads(process.stdout.strip().splitlines()[-1])
+    imports = import_times(process.stderr)
+    return {
+        'import_ms': imports['pc'][1] / 1000,
+        'interpreter_ms': (marks['started'] - launched) * 1000,
+        'shell_ms': (marks['shell'] - launched) * 1000,
+        'first_sample_ms': (marks['first_sample'] - launched) * 1000,
+        'heaviest': sorted(imports, key=lambda name: imports[name][0], reverse=True)[:5],
+    }
+
+
+def bench_startup(real_tk, runs=STARTUP_RUNS):
+    # Launch to shell on screen to first reading, in fresh interpreters; the
+    # import figure is pc's cumulative time from -X importtime
+    starts = [cold_start(real_tk) for _ in range(runs)]
+    result = {'runs': runs, 'target_ms': STARTUP_TARGET_MS}
+    for key in ('import_ms', 'interpreter_ms', 'shell_ms', 'first_sample_ms'):
+        result[key] = round(percentile(sorted(start[key] for start in starts), 0.5), 1)
+    result['heaviest_imports'] = starts[-1]['heaviest']
+    return result
+
+
+def bench_sources(rounds):
+    results = {}
+    for name in SOURCES:
+        try:
+            source = create_source(name)
+        except OSError:
+            continue  # procfs off Linux
+        results[name] = {probe: round(cost, 2) for probe, cost in benchmark(source, rounds).items()}
+        source.close()
+    return results
+
+
+def run_benchmarks(rounds=1000, real_tk=False):
+    import platform
+    results = {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'renderer': 'tk' if real_tk else 'fake',
+        'benchmarks': {},
+    }
+    results['benchmarks'].update(bench_sampler(rounds))
+    results['benchmarks'].update(bench_render(rounds, real_tk))
+    results['wakeups'] = count_wakeups()
+    results['startup'] = bench_startup(real_tk)
+    results['sources'] = bench_sources(rounds)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Names of benchmarks whose median got more than `tolerance` slower
+    regressions = []
+    if baseline.get('version') != results['version']:
+        raise ValueError(f"baseline is results version {baseline.get('version')}, expected {results['version']}")
+    for name, current in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous and current['p50_us'] > previous['p50_us'] * (1 + tolerance):
+            regressions.append((name, previous['p50_us'], current['p50_us']))
+    first_sample = results['startup']['first_sample_ms']
+    if first_sample > STARTUP_TARGET_MS:
+        regressions.append(('startup.first_sample_ms', STARTUP_TARGET_MS, first_sample))
+    old_rate = baseline.get('wakeups', {}).get('per_second')
+    if old_rate is not None and results['wakeups']['per_second'] > old_rate * (1 + tolerance):
+        regressions.append(('wakeups.per_second', old_rate, results['wakeups']['per_second']))
+    return regressions
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(prog='pc.py bench', description="Performance Police benchmarks")
+    parser.add_argument('-n', '--rounds', type=int, default=1000, help="calls per benchmark")
+    parser.add_argument('-o', '--output', default='-', help="file to write the JSON results to ('-' for stdout)")
+    parser.add_argument('--tk', action='store_true', help="render into a real Tk window (needs a display or Xvfb)")
+    parser.add_argument('--baseline', metavar='PATH', help="earlier results to compare against; exits 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown against the baseline, as a fraction")
+    return parser
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+def run(args):
+    results = run_benchmarks(rounds=args.rounds, real_tk=args.tk)
+    text = json.dumps(results, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"Regression: {name} {before} -> {after}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+import argparse
+import json
+import sys
+import time
+
+from diskmon import DiskMonitor
+from moods import MOOD_DATA
+from netmon import NetworkMonitor, parse_capacity
+from probes import Probe, ProbeExecutor
+from psimon import PressureMonitor
+from sources import SOURCES, create_source
+from thermal import ThermalMonitor
+
+
+# Shortest counter window (CPU seconds per core) worth turning into a percentage
+MIN_CPU_WINDOW = 0.05
+# Wall-clock window measured up front for sources whose counters don't start at boot
+SEED_WINDOW = 0.1
+
+
+def cpu_total(times):
+    # Linux already counts guest time inside user/nice, don't count it twice
+    return sum(times) - getattr(times, 'guest', 0) - getattr(times, 'guest_nice', 0)
+
+
+def busy_fraction(prev, cur):
+    # Share of the elapsed CPU time between two cpu_times() snapshots that
+    # wasn't spent idle (or waiting on I/O, which is idle from the CPU's view)
+    prev_idle = prev.idle + getattr(prev, 'iowait', 0)
+    cur_idle = cur.idle + getattr(cur, 'iowait', 0)
+    total = cpu_total(cur) - cpu_total(prev)
+    if total <= 0:
+        return None
+    busy = total - (cur_idle - prev_idle)
+    return min(max(busy / total, 0.0), 1.0)
+
+
+def since_boot_percent(cores):
+    total = sum(map(cpu_total, cores))
+    if total <= 0:
+        return 0.0
+    idle = sum(core.idle + getattr(core, 'iowait', 0) for core in cores)
+    return round(min(max(1 - idle / total, 0.0), 1.0) * 100, 1)
+
+
+class CpuSampler:
+    # Non-blocking replacement for cpu_percent(interval=0.5): reads the raw
+    # counters once per call and works out utilisation from the previous
+    # snapshot, so a sample costs microseconds instead of half a second.
+    def __init__(self, source):
+        self.source = source
+        self.prev_cores = source.cpu_times()
+        self.per_core = [0.0] * len(self.prev_cores)
+        if source.counters_since_boot:
+            # Until a real window has passed, the best guess is the average since boot
+            self.percent = since_boot_percent(self.prev_cores)
+        else:
+            self.percent = self.seed()
+
+    def seed(self):
+        # No history to average over, so measure a short window of our own
+        time.sleep(SEED_WINDOW)
+        cores = self.source.cpu_times()
+        if len(cores) != len(self.prev_cores):
+            self.prev_cores = cores
+            return 0.0
+        fractions = [busy_fraction(prev, cur) for prev, cur in zip(self.prev_cores, cores)]
+        self.prev_cores = cores
+        fractions = [fraction for fraction in fractions if fraction is not None]
+        if not fractions:
+            return 0.0
+        return round(sum(fractions) / len(fractions) * 100, 1)
+
+    def sample(self):
+        cores = self.source.cpu_times()
+
+        # CPUs can be hot-plugged; start over when the core count changes
+        if len(cores) != len(self.prev_cores):
+            self.prev_cores = cores
+            self.per_core = [0.0] * len(cores)
+            return self.percent
+
+        # Counters tick in 10 ms steps; a window of only a few ticks reads as
+        # 0% or 100%, so wait until enough time has passed to mean something
+        if sum(map(cpu_total, cores)) - sum(map(cpu_total, self.prev_cores)) < MIN_CPU_WINDOW * len(cores):
+            return self.percent
+
+        per_core = []
+        busy_total = 0.0
+        elapsed_total = 0.0
+        for prev, cur in zip(self.prev_cores, cores):
+            fraction = busy_fraction(prev, cur)
+            if fraction is None:
+                # No time passed on this core since last call, keep last reading
+                per_core.append(self.per_core[len(per_core)])
+                continue
+            elapsed = cpu_total(cur) - cpu_total(prev)
+            per_core.append(round(fraction * 100, 1))
+            busy_total += fraction * elapsed
+            elapsed_total += elapsed
+
+        if elapsed_total > 0:
+            self.percent = round(busy_total / elapsed_total * 100, 1)
+        self.per_core = per_core
+        self.prev_cores = cores
+        return self.percent
+
+
+# Slow probes get their own cadence: battery charge and filesystem fill
+# levels barely move between ticks, and statvfs is what hangs on a bad mount
+BATTERY_EVERY = 30.0
+PARTITIONS_EVERY = 30.0
+# Temperatures move over seconds; no point re-reading them at the 250 ms hot cadence
+SENSORS_EVERY = 1.0
+# Per-probe deadlines, in seconds, before a tick publishes the last good value
+PROBE_DEADLINE = 0.25
+PARTITIONS_DEADLINE = 1.0
+
+
+class SystemSampler:
+    # Takes the same CPU/RAM/disk/network/battery readings the desktop UI shows,
+    # without touching Tk, so it can run on headless boxes. CPU and RAM are
+    # read on the calling thread; everything that can block (filesystems,
+    # block devices, NICs, battery firmware, PSI, hardware sensors) runs on a
+    # probe worker with a deadline, so one hung mount can't hold the CPU and RAM readouts back.
+    def __init__(self, source=None, network=None, disk=None, clock=time.monotonic, concurrent=True):
+        # Raw counters come from a pluggable source; psutil unless told otherwise
+        self.source = source or create_source()
+        self.clock = clock  # rate window clock; the benchmark swaps in a virtual one
+        self.cpu = CpuSampler(self.source)
+        self.disk = disk or DiskMonitor(source=self.source, clock=clock)
+        self.network = network or NetworkMonitor(source=self.source, clock=clock)
+        self.pressure = PressureMonitor(source=self.source, clock=clock)
+        self.thermal = ThermalMonitor(self.source, self.cpu)
+        self.last_timestamp = time.time()
+        self.probes = [
+            Probe('cpu', lambda now: self.cpu.sample(), inline=True),
+            Probe('ram', lambda now: self.source.memory_percent(), inline=True),
+            Probe('disk_io', self.disk.sample_io, deadline=PROBE_DEADLINE),
+            Probe('partitions', self.disk.sample_partitions, deadline=PARTITIONS_DEADLINE, every=PARTITIONS_EVERY),
+            Probe('network', self.network.sample, deadline=PROBE_DEADLINE),
+            Probe('battery', self.read_battery, deadline=PROBE_DEADLINE, every=BATTERY_EVERY, default=100),
+            Probe('psi', self.pressure.sample, deadline=PROBE_DEADLINE),
+            Probe('thermal', self.thermal.sample, deadline=PROBE_DEADLINE, every=SENSORS_EVERY),
+        ]
+        # concurrent=False runs every probe back to back on the calling thread
+        self.executor = ProbeExecutor(self.probes) if concurrent else None
+        # Seconds each probe took on its last run, filled in place
+        self.probe_times = {probe.name: 0.0 for probe in self.probes}
+        self.sample_time = 0.0
+        # Fields published from an earlier tick because their probe missed its deadline
+        self.stale = frozenset()
+
+    def read_battery(self, now):
+        try:
+            battery = self.source.battery()
+            if battery:
+                battery_percent, plugged = battery
+                # If plugged in, show as "full" for mood purposes
+                if plugged:
+                    battery_percent = 100
+            else:
+                battery_percent = 100  # Assume desktop PC
+        except:
+            battery_percent = 100  # Default for systems without battery
+        return battery_percent
+
+    def get_system_stats(self):
+        # One timestamp for the whole tick; the probes below all run against it
+        current_time = time.time()
+        self.last_timestamp = current_time
+        started = time.perf_counter()
+
+        now = self.clock()
+        if self.executor is not None:
+            values = self.executor.run(now)
+            self.stale = frozenset(PROBE_FIELDS.get(name, name) for name in self.executor.stale)
+        else:
+            values = {}
+            stale = set()
+            for probe in self.probes:
+                if probe.due(now) and not probe.refresh(now):
+                    stale.add(probe.name)
+                values[probe.name] = probe.current()
+            self.stale = frozenset(PROBE_FIELDS.get(name, name) for name in stale)
+
+        for probe in self.probes:
+            self.probe_times[probe.name] = probe.duration
+        self.sample_time = time.perf_counter() - started
+
+        # Disk: fullest real filesystem or busiest device, whichever is worse
+        disk_percent = self.disk.combine(values['partitions'], values['disk_io'])
+        return (values['cpu'], values['ram'], disk_percent, values['network'],
+                values['battery'], values['psi'], values['thermal'])
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.close()
+        # The procfs, cgroup and sensor backends hold their files open until now
+        self.disk.mounts.close()
+        self.source.close()
+
+
+STAT_FIELDS = ('cpu', 'ram', 'disk', 'network', 'battery', 'psi', 'thermal')
+# Fields added later, with the value to assume for agents and logs that predate them
+FIELD_DEFAULTS = {'psi': 0.0, 'thermal': 0.0}
+BATTERY = STAT_FIELDS.index('battery')
+# Probes that feed a field under another name
+PROBE_FIELDS = {'disk_io': 'disk', 'partitions': 'disk'}
+
+# Adaptive cadence for the widget: slow while everything is calm, fast while
+# something is hot or moving, the old fixed 3 s in between
+IDLE_INTERVAL = 15.0
+NORMAL_INTERVAL = 3.0
+HOT_INTERVAL = 0.25
+HOT_THRESHOLD = 85.0
+# A metric moving this many points between two samples counts as hot too
+HOT_JUMP = 15.0
+# Stay fast for this many samples after the last hot one so a spike isn't chased
+# back to a 3 s cadence between its peaks
+HOT_HOLD = 8
+
+
+class AdaptiveInterval:
+    # Picks the delay before the next sample from the one just taken. Idle
+    # means every metric sits in its calmest mood_data band; hot means any
+    # metric is at or over `hot_threshold`, or jumped by `jump` points.
+    def __init__(self, idle=IDLE_INTERVAL, normal=NORMAL_INTERVAL, hot=HOT_INTERVAL,
+                 hot_threshold=HOT_THRESHOLD, jump=HOT_JUMP, mood_data=MOOD_DATA):
+        self.idle = idle
+        self.normal = normal
+        self.hot = hot
+        self.hot_threshold = hot_threshold
+        self.jump = jump
+        # Upper edge of the calmest band per usage metric; below the second
+        # threshold the mood engine still picks the first mood
+        self.usage = tuple(i for i, field in enumerate(STAT_FIELDS) if i != BATTERY)
+        self.calm_below = tuple(
+            mood_data[STAT_FIELDS[i]][1]['threshold'] if len(mood_data.get(STAT_FIELDS[i], ())) > 1 else 0
+            for i in self.usage
+        )
+        self.battery_low = mood_data['battery'][0]['threshold']
+        self.previous = None
+        self.hot_left = 0
+        self.interval = normal
+
+    def next_interval(self, stats):
+        usage = [stats[i] for i in self.usage]
+        battery = stats[BATTERY]
+        moving = self.previous is not None and any(
+            abs(value - before) >= self.jump for value, before in zip(stats, self.previous)
+        )
+        self.previous = stats
+
+        if moving or max(usage) >= self.hot_threshold:
+            self.hot_left = HOT_HOLD
+        if self.hot_left > 0:
+            self.hot_left -= 1
+            self.interval = self.hot
+        elif battery > self.battery_low and all(value < calm for value, calm in zip(usage, self.calm_below)):
+            self.interval = self.idle
+        else:
+            self.interval = self.normal
+        return self.interval
+
+
+class HeadlessCollector:
+    # Samples on a fixed period and streams one record per tick to a file-like
+    # object. Records are JSON lines by default, or CSV for spreadsheet people.
+    def __init__(self, out, interval=3.0, fmt='json', sampler=None, per_core=False, history=None,
+                 recorder=None, per_nic=False, per_disk=False, exporter=None, per_psi=False, per_sensor=False):
+        self.out = out
+        self.interval = interval
+        self.fmt = fmt
+        self.per_core = per_core
+        self.per_nic = per_nic
+        self.per_disk = per_disk
+        self.per_psi = per_psi
+        self.per_sensor = per_sensor
+        self.history = history  # optional history.HistoryStore to keep samples in
+        self.recorder = recorder  # optional flightlog.FlightLogWriter
+        self.exporter = exporter  # optional exporter.MetricsExporter
+        self.sampler = sampler or SystemSampler()
+        import socket  # only the headless modes need it; keeps the widget's startup imports down
+        self.host = socket.gethostname()
+        self.running = False
+
+    def format_sample(self, timestamp, stats):
+        if self.fmt == 'csv':
+            values = ','.join(f"{value:.1f}" for value in stats)
+            return f"{timestamp:.3f},{self.host},{values}\n"
+
+        record = {'ts': round(timestamp, 3), 'host': self.host}
+        for name, value in zip(STAT_FIELDS, stats):
+            record[name] = round(value, 1)
+        if self.sampler.stale:
+            # Published from an earlier tick because the probe missed its deadline
+            record['stale'] = sorted(self.sampler.stale)
+        if self.per_core:
+            record['cores'] = self.sampler.cpu.per_core
+        # Only the cgroup source knows about CFS throttling
+        throttled = getattr(self.sampler.source, 'throttled_percent', None)
+        if throttled is not None:
+            record['throttled'] = throttled
+        if self.sampler.thermal.throttled:
+            record['thermal_throttling'] = True
+        if self.sampler.disk.cause == 'io':
+            # The disk reading is a saturated device rather than a full filesystem
+            record['disk_cause'] = 'io'
+        if self.per_nic:
+            record['nics'] = {
+                name: {key: round(value, 1) for key, value in nic.as_dict().items() if key != 'name'}
+                for name, nic in self.sampler.network.rates.items()
+            }
+        if self.per_disk:
+            record['disks'] = {
+                name: {key: round(value, 1) for key, value in device.as_dict().items() if key != 'name'}
+                for name, device in self.sampler.disk.devices.items()
+            }
+            record['mounts'] = self.sampler.disk.usage
+        if self.per_psi:
+            record['pressure'] = {
+                resource: {'some': round(some, 1), 'full': round(full, 1)}
+                for resource, (some, full) in self.sampler.pressure.rates.items()
+            }
+        if self.per_sensor:
+            record['sensors'] = self.sampler.thermal.as_dict()
+        return json.dumps(record, separators=(',', ':')) + "\n"
+
+    def run(self, count=None):
+        self.running = True
+        if self.fmt == 'csv':
+            self.out.write("ts,host," + ','.join(STAT_FIELDS) + "\n")
+
+        # Deadline based loop so a slow sample doesn't push every later tick back
+        next_tick = time.monotonic()
+        written = 0
+        while self.running and (count is None or written < count):
+            try:
+                stats = self.sampler.get_system_stats()
+                if self.history is not None:
+                    self.history.append(self.sampler.last_timestamp, stats)
+                if self.recorder is not None:
+                    self.recorder.append(self.sampler.last_timestamp, stats)
+                if self.exporter is not None:
+                    self.exporter.publish(self.sampler.last_timestamp, stats, self.sampler.disk.cause,
+                                          self.sampler.thermal.cause)
+            except Exception as e:
+                print(f"Monitoring error: {e}", file=sys.stderr)
+                stats = None
+
+            if stats is not None:
+                # Output errors (closed pipe, dropped socket) end the run
+                self.out.write(self.format_sample(self.sampler.last_timestamp, stats))
+                self.out.flush()
+                written += 1
+
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind, start counting from now instead of bursting
+                next_tick = time.monotonic()
+
+    def stop(self):
+        self.running = False
+
+
+def build_sampler(args):
+    # Shared by `collect` and the desktop widget, which take the same options
+    try:
+        source = create_source(args.source)
+    except OSError as e:
+        # e.g. --source cgroup outside cgroup v2; the widget is already on screen by now
+        print(f"Can't use --source {args.source} ({e}), falling back to psutil", file=sys.stderr)
+        source = create_source('psutil')
+    per_nic, default = parse_capacity(args.link_capacity)
+    network = NetworkMonitor(source=source, capacity=per_nic, default_capacity=default)
+    return SystemSampler(source=source, network=network)
+
+
+def add_sampler_arguments(parser):
+    parser.add_argument('--source', choices=sorted(SOURCES) + ['auto'], default='psutil',
+                        help="where raw counters come from (procfs is the Linux fast path, cgroup measures "
+                             "against the container's limits)")
+    parser.add_argument('--link-capacity', action='append', metavar='[NIC=]MBPS',
+                        help="link speed for a NIC, or the default for NICs that don't report one")
+
+
+def start_exporter(listen):
+    # Shared by `collect` and the desktop widget; None when --metrics wasn't given
+    if not listen:
+        return None
+    from exporter import MetricsExporter, parse_listen
+    exporter = MetricsExporter(parse_listen(listen))
+    exporter.start()
+    return exporter
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(prog='pc.py collect', description="Headless system sampler")
+    parser.add_argument('-i', '--interval', type=float, default=3.0, help="seconds between samples")
+    parser.add_argument('-n', '--count', type=int, default=None, help="stop after this many samples")
+    parser.add_argument('-o', '--output', default='-', help="file to append samples to ('-' for stdout)")
+    parser.add_argument('-f', '--format', choices=('json', 'csv'), default='json', help="record format")
+    parser.add_argument('--per-core', action='store_true', help="include per-core CPU in JSON records")
+    parser.add_argument('--per-nic', action='store_true', help="include per-interface network rates in JSON records")
+    parser.add_argument('--per-disk', action='store_true', help="include per-device I/O and per-mount usage in JSON records")
+    parser.add_argument('--per-psi', action='store_true', help="include per-resource stall percentages in JSON records")
+    parser.add_argument('--per-sensor', action='store_true',
+                        help="include temperatures, fan speeds and clock speed in JSON records")
+    parser.add_argument('--record', metavar='PATH', help="also append samples to a binary flight log")
+    parser.add_argument('--metrics', metavar='[HOST:]PORT', help="serve /metrics for Prometheus on this address")
+    add_sampler_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+def run(args):
+    recorder = None
+    if args.record:
+        from flightlog import FlightLogWriter
+        recorder = FlightLogWriter(args.record)
+    exporter = start_exporter(args.metrics)
+
+    if args.output == '-':
+        out = sys.stdout
+    else:
+        out = open(args.output, 'a', buffering=1)
+
+    sampler = build_sampler(args)
+    collector = HeadlessCollector(out, interval=args.interval, fmt=args.format, sampler=sampler,
+                                  per_core=args.per_core, per_nic=args.per_nic,
+                                  per_disk=args.per_disk, per_psi=args.per_psi, per_sensor=args.per_sensor,
+                                  recorder=recorder,
+                                  exporter=exporter)
+    try:
+        collector.run(count=args.count)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if recorder is not None:
+            recorder.close()
+        if exporter is not None:
+            exporter.close()
+        sampler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
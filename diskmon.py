@@ -0,0 +1,193 @@
+import os
+import re
+import select
+import time
+
+from sources import load_psutil
+
+# Filesystems that can't fill up in a way the user can fix, or that live in RAM
+PSEUDO_FSTYPES = {
+    'tmpfs', 'devtmpfs', 'ramfs', 'squashfs', 'overlay', 'proc', 'sysfs', 'cgroup',
+    'cgroup2', 'devpts', 'mqueue', 'debugfs', 'tracefs', 'securityfs', 'pstore',
+    'bpf', 'autofs', 'fusectl', 'configfs', 'hugetlbfs', 'nsfs', 'binfmt_misc',
+    'efivarfs', 'rpc_pipefs', 'fuse.gvfsd-fuse', 'fuse.portal', 'iso9660', 'udf',
+}
+# Network filesystems are skipped by default: statvfs on a hung server blocks
+NETWORK_FSTYPES = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'fuse.sshfs', 'sshfs', '9p', 'ceph', 'glusterfs'}
+
+# Block devices that aren't real disks
+SKIP_DEVICE_PREFIXES = ('loop', 'ram', 'zram', 'fd', 'sr')
+
+# Without mount notifications (non-Linux) the partition list is re-read this often
+MOUNT_REFRESH = 60.0
+
+
+class MountWatcher:
+    # On Linux, /proc/self/mounts flags POLLPRI whenever the mount table
+    # changes, so checking it is a single non-blocking poll(). Elsewhere we
+    # fall back to re-reading the partition list every MOUNT_REFRESH seconds.
+    def __init__(self):
+        self.file = None
+        self.poller = None
+        self.checked_at = None
+        try:
+            self.file = open('/proc/self/mounts', 'rb')
+            self.file.read()
+            self.poller = select.poll()
+            self.poller.register(self.file.fileno(), select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):
+            self.close()
+
+    def changed(self, now):
+        if self.poller is not None:
+            if not self.poller.poll(0):
+                return False
+            # Reading the table again re-arms the notification
+            self.file.seek(0)
+            self.file.read()
+            return True
+        if self.checked_at is None or now - self.checked_at >= MOUNT_REFRESH:
+            self.checked_at = now
+            return True
+        return False
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.poller = None
+
+
+def partition_of(name, disk):
+    # sda -> sda1, but a disk whose name ends in a digit puts a 'p' in between:
+    # nvme0n1 -> nvme0n1p1, mmcblk0 -> mmcblk0p1. sdaa and dm-10 are disks of their own.
+    separator = 'p' if disk[-1:].isdigit() else ''
+    return re.fullmatch(re.escape(disk + separator) + r'\d+', name) is not None
+
+
+def whole_disks(names):
+    # Judged by name alone, so sources that don't mirror this host's /sys/block work too
+    return [name for name in names if not any(partition_of(name, other) for other in names if other != name)]
+
+
+class DeviceRates:
+    __slots__ = ('name', 'iops', 'read_mb', 'write_mb', 'busy', 'await_ms')
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class DiskMonitor:
+    # Disk health as the worse of two things: how full the fullest real
+    # filesystem is, and how saturated the busiest block device is. I/O rates
+    # come from disk_io_counters(perdisk=True) deltas; the partition list is
+    # cached and only re-read when the mount table changes.
+    def __init__(self, source, skip_fstypes=PSEUDO_FSTYPES | NETWORK_FSTYPES, clock=time.monotonic):
+        self.source = source
+        self.clock = clock
+        self.skip_fstypes = set(skip_fstypes)
+        self.mounts = MountWatcher()
+        self.partitions = []
+        self.usage = {}
+        self.disk_names = ((), [])  # last device list seen and the whole disks in it
+        self.prev_io = self.read_io()
+        self.prev_time = clock()
+        self.devices = {}
+        self.space_percent = 0.0
+        self.io_percent = 0.0
+        self.percent = 0.0
+        self.cause = 'space'
+
+    def read_io(self):
+        try:
+            counters = self.source.disk_io()
+        except (OSError, RuntimeError):
+            return {}
+        names = tuple(name for name in counters if not name.startswith(SKIP_DEVICE_PREFIXES))
+        # Linux lists partitions (sda1, nvme0n1p1) next to their disk; keep whole disks only
+        if names != self.disk_names[0]:
+            self.disk_names = (names, whole_disks(names))
+        disks = self.disk_names[1]
+        return {name: counters[name] for name in disks}
+
+    def refresh_partitions(self):
+        partitions = []
+        seen_devices = set()
+        for part in load_psutil().disk_partitions(all=False):
+            if part.fstype in self.skip_fstypes:
+                continue
+            if 'ro' in part.opts.split(','):
+                continue  # a read-only mount can't fill up
+            if part.device in seen_devices:
+                continue  # bind mount of something already tracked
+            seen_devices.add(part.device)
+            partitions.append(part.mountpoint)
+        if not partitions:
+            # Containers often only have overlay mounts; the root is still worth watching
+            partitions.append(os.path.abspath(os.sep))
+        self.partitions = partitions
+
+    def sample_space(self):
+        usage = {}
+        disk_usage = load_psutil().disk_usage
+        for mountpoint in self.partitions:
+            try:
+                usage[mountpoint] = disk_usage(mountpoint).percent
+            except OSError:
+                continue  # unmounted since the last refresh
+        self.usage = usage
+        return max(usage.values(), default=0.0)
+
+    def sample_io(self, now):
+        elapsed = now - self.prev_time
+        current = self.read_io()
+        if elapsed <= 0:
+            return self.io_percent
+
+        devices = {}
+        for name, counters in current.items():
+            previous = self.prev_io.get(name)
+            if previous is None:
+                continue
+            ios = (counters.read_count - previous.read_count) + (counters.write_count - previous.write_count)
+            io_time = (counters.read_time - previous.read_time) + (counters.write_time - previous.write_time)
+
+            device = DeviceRates()
+            device.name = name
+            device.iops = max(ios, 0) / elapsed
+            device.read_mb = max(counters.read_bytes - previous.read_bytes, 0) / elapsed / 1024 / 1024
+            device.write_mb = max(counters.write_bytes - previous.write_bytes, 0) / elapsed / 1024 / 1024
+            # busy_time (ms the device had I/O in flight) only exists on Linux/FreeBSD
+            busy_time = getattr(counters, 'busy_time', None)
+            if busy_time is not None:
+                device.busy = min(max(busy_time - previous.busy_time, 0) / (elapsed * 1000) * 100, 100.0)
+            else:
+                device.busy = 0.0
+            device.await_ms = io_time / ios if ios > 0 else 0.0
+            devices[name] = device
+
+        self.prev_io = current
+        self.prev_time = now
+        self.devices = devices
+        return max((device.busy for device in devices.values()), default=0.0)
+
+    def sample_partitions(self, now):
+        # The filesystem half; the sampler runs it on its own slower cadence
+        if self.mounts.changed(now) or not self.partitions:
+            self.refresh_partitions()
+        return self.sample_space()
+
+    def combine(self, space_percent, io_percent):
+        self.space_percent = space_percent
+        self.io_percent = io_percent
+        if self.io_percent > self.space_percent:
+            self.percent = self.io_percent
+            self.cause = 'io'
+        else:
+            self.percent = self.space_percent
+            self.cause = 'space'
+        return self.percent
+
+    def sample(self, now=None):
+        now = self.clock() if now is None else now
+        return self.combine(self.sample_partitions(now), self.sample_io(now))
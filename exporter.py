@@ -0,0 +1,112 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from collector import STAT_FIELDS
+from moods import MOOD_DATA, MoodEngine
+from streaming import StreamingStats
+
+DEFAULT_PORT = 9312
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HELP = {
+    'cpu': "CPU utilisation across all cores.",
+    'ram': "Memory in use, excluding reclaimable cache.",
+    'disk': "Fullest real filesystem or busiest block device, whichever is worse.",
+    'network': "Saturation of the busiest physical link.",
+    'battery': "Battery charge, 100 when plugged in or without a battery.",
+    'psi': "Share of time some task stalled on CPU, memory or I/O (worst of the three).",
+    'thermal': "Hottest temperature sensor against its own limit, at least 90 while the CPU throttles.",
+}
+
+
+def parse_listen(text):
+    # "9312", ":9312" or "0.0.0.0:9312"; binds to localhost unless told otherwise
+    host, _, port = str(text).rpartition(':')
+    return host or '127.0.0.1', int(port or DEFAULT_PORT)
+
+
+def render(timestamp, stats, p95s, category, level):
+    lines = []
+    for field, value in zip(STAT_FIELDS, stats or ()):
+        name = f"perfpolice_{field}_percent"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"# UNIT {name} percent")
+        lines.append(f"# HELP {name} {HELP[field]}")
+        lines.append(f"{name} {value:.1f}")
+    for field, value in zip(STAT_FIELDS, p95s or ()):
+        name = f"perfpolice_{field}_p95_percent"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"# UNIT {name} percent")
+        lines.append(f"# HELP {name} 95th percentile of {field} over the last few hundred samples.")
+        lines.append(f"{name} {value:.1f}")
+    if stats is not None:
+        lines.append("# TYPE perfpolice_mood_level gauge")
+        lines.append("# HELP perfpolice_mood_level Current mood within its category, 0 is the calmest.")
+        lines.append(f'perfpolice_mood_level{{category="{category}"}} {level}')
+        lines.append("# TYPE perfpolice_last_sample_timestamp_seconds gauge")
+        lines.append("# UNIT perfpolice_last_sample_timestamp_seconds seconds")
+        lines.append("# HELP perfpolice_last_sample_timestamp_seconds When the values above were sampled.")
+        lines.append(f"perfpolice_last_sample_timestamp_seconds {timestamp:.3f}")
+    lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        # One attribute read: the monitor thread swaps in a new body, never edits it
+        body = self.server.exporter.body
+        accept = self.headers.get('Accept', '')
+        self.send_response(200)
+        self.send_header('Content-Type', OPENMETRICS_TYPE if 'openmetrics' in accept else PROMETHEUS_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would drown out everything else
+
+
+class MetricsExporter:
+    # Serves /metrics for Prometheus-style scrapers. The response is rendered
+    # once per sample by whoever took it and kept as an immutable bytes
+    # object, so a scrape is a single attribute read: any number of scrapers
+    # can hit it without sampling anything or taking a lock the monitor
+    # thread also needs.
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT), mood_data=MOOD_DATA):
+        self.address = address
+        # Same smoothing and hysteresis as the widget, so both show the same mood
+        self.streaming = StreamingStats()
+        self.mood_engine = MoodEngine(mood_data)
+        self.body = render(None, None, None, None, None)
+        self.server = None
+
+    def publish(self, timestamp, stats, disk_cause='space', thermal_cause='heat'):
+        smoothed = self.streaming.update(timestamp, stats)
+        category = self.mood_engine.update(*smoothed, disk_cause, thermal_cause)[0]
+        level = self.mood_engine.state[1]
+        p95s = [self.streaming.p95(field) for field in STAT_FIELDS]
+        self.body = render(timestamp, stats, p95s, category, level)
+
+    def start(self):
+        self.server = ThreadingHTTPServer(self.address, MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+
+from collector import FIELD_DEFAULTS, STAT_FIELDS, HeadlessCollector, SystemSampler
+from history import HistoryStore
+from moods import severity
+
+# Agents speak the collector's JSON lines over a plain stream socket: one
+# record per line, each carrying its own host name. No handshake, so
+# `pc.py collect | nc aggregator 9311` is a valid agent too.
+DEFAULT_PORT = 9311
+LINE_LIMIT = 64 * 1024
+
+# 15 minutes of raw samples and 4 hours of 1 min rollups per host, ~100 KB each
+FLEET_CAPACITY = 900
+FLEET_TIERS = ((60, 240),)
+
+# A host is listed as offline once it has been quiet this long
+STALE_AFTER = 10.0
+# Agents sending faster than this are slowed down by not reading their socket
+MIN_INTERVAL = 0.1
+
+
+def parse_address(text):
+    # "unix:/run/pp.sock", "host:port" or just ":port"; None means the default port
+    text = text or ':'
+    if text.startswith('unix:'):
+        return 'unix', text[5:]
+    host, _, port = text.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port or DEFAULT_PORT))
+
+
+def format_address(address):
+    kind, target = address
+    if kind == 'unix':
+        return f"unix:{target}"
+    return f"{target[0]}:{target[1]}"
+
+
+def connect(address):
+    kind, target = address
+    if kind == 'unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target)
+        return sock
+    return socket.create_connection(target)
+
+
+def run_agent(address, interval=1.0, sampler=None):
+    # Streams local samples to an aggregator, reconnecting with backoff
+    sampler = sampler or SystemSampler()
+    backoff = 1.0
+    while True:
+        try:
+            sock = connect(address)
+        except OSError as e:
+            print(f"Agent can't reach {format_address(address)}: {e}", file=sys.stderr)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+
+        backoff = 1.0
+        with sock, sock.makefile('w', encoding='utf-8') as out:
+            try:
+                HeadlessCollector(out, interval=interval, sampler=sampler).run()
+            except OSError as e:
+                print(f"Agent disconnected: {e}", file=sys.stderr)
+        time.sleep(backoff)
+
+
+class HostState:
+    __slots__ = ('host', 'history', 'latest', 'timestamp', 'last_seen', 'severity', 'disk_cause',
+                 'thermal_cause')
+
+    def __init__(self, host):
+        self.host = host
+        self.history = HistoryStore(capacity=FLEET_CAPACITY, tiers=FLEET_TIERS)
+        self.latest = None
+        self.timestamp = None  # the agent's own clock for `latest`
+        self.last_seen = 0.0
+        self.severity = 0.0
+        # What's behind the agent's disk and thermal readings, for the mood
+        self.disk_cause = 'space'
+        self.thermal_cause = 'heat'
+
+
+class FleetAggregator:
+    # Ingests many agents on one asyncio loop. Each connection is read line by
+    # line straight into that host's ring buffers; nothing is queued in
+    # between, so a slow aggregator simply stops reading and TCP pushes back
+    # on the agents instead of memory growing.
+    def __init__(self, stale_after=STALE_AFTER, min_interval=MIN_INTERVAL):
+        self.stale_after = stale_after
+        self.min_interval = min_interval
+        self.hosts = {}
+        self.connections = 0
+        self.samples = 0
+        self.errors = 0
+        self.server = None
+        self.loop = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        clock = asyncio.get_running_loop().time
+        last = 0.0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.ingest(line)
+
+                wait = last + self.min_interval - clock()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                last = clock()
+        except (ConnectionError, ValueError) as e:
+            # ValueError: a line longer than LINE_LIMIT, the agent is broken
+            print(f"Dropping agent: {e}", file=sys.stderr)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def ingest(self, line):
+        try:
+            record = json.loads(line)
+            host = str(record['host'])
+            timestamp = float(record['ts'])
+            # Agents from before a field existed don't send it; anything else missing is an error
+            stats = tuple(float(record.get(field, FIELD_DEFAULTS.get(field))) for field in STAT_FIELDS)
+        except (ValueError, KeyError, TypeError):
+            self.errors += 1
+            return
+
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(host)
+        state.history.append(timestamp, stats)
+        state.latest = stats
+        state.timestamp = timestamp
+        state.last_seen = time.monotonic()
+        state.severity = severity(*stats)
+        state.disk_cause = 'io' if record.get('disk_cause') == 'io' else 'space'
+        state.thermal_cause = 'throttle' if record.get('thermal_throttling') else 'heat'
+        self.samples += 1
+
+    async def start(self, address):
+        kind, target = address
+        if kind == 'unix':
+            self.server = await asyncio.start_unix_server(self.handle, path=target, limit=LINE_LIMIT)
+        else:
+            host, port = target
+            self.server = await asyncio.start_server(
+                self.handle, host, port, limit=LINE_LIMIT, backlog=1024
+            )
+        return self.server
+
+    def start_in_thread(self, address):
+        # Runs the loop on a daemon thread for the Tk dashboard; returns once listening
+        ready = threading.Event()
+        failure = []
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.start(address))
+            except OSError as e:
+                failure.append(e)
+                ready.set()
+                return
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+
+    def ranking(self):
+        # Live hosts, worst mood first, plus how many have gone quiet
+        now = time.monotonic()
+        live = []
+        offline = 0
+        for state in list(self.hosts.values()):
+            if state.latest is None:
+                continue
+            if now - state.last_seen > self.stale_after:
+                offline += 1
+            else:
+                live.append(state)
+        live.sort(key=lambda state: state.severity, reverse=True)
+        return live, offline
+
+
+async def report(aggregator, every):
+    previous = aggregator.samples
+    while True:
+        await asyncio.sleep(every)
+        live, offline = aggregator.ranking()
+        rate = (aggregator.samples - previous) / every
+        previous = aggregator.samples
+        worst = f"{live[0].host} {live[0].severity:.0f}%" if live else "-"
+        print(
+            f"hosts={len(live)} offline={offline} connections={aggregator.connections} "
+            f"samples/s={rate:.0f} errors={aggregator.errors} worst={worst}",
+            flush=True
+        )
+
+
+async def serve_forever(address, report_every=5.0):
+    aggregator = FleetAggregator()
+    server = await aggregator.start(address)
+    async with server:
+        await asyncio.gather(server.serve_forever(), report(aggregator, report_every))
+
+
+async def simulate_agent(address, host, interval, rng, duration=None):
+    # Fake agent: a random walk with the odd spike, same wire format as the real one
+    kind, target = address
+    if kind == 'unix':
+        reader, writer = await asyncio.open_unix_connection(target)
+    else:
+        reader, writer = await asyncio.open_connection(*target)
+
+    values = [rng.uniform(5, 60), rng.uniform(20, 70), rng.uniform(10, 90), rng.uniform(0, 20), 100.0,
+              rng.uniform(0, 10), rng.uniform(35, 65)]
+    await asyncio.sleep(rng.uniform(0, interval))  # spread agents over the period
+    started = time.monotonic()
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            for i in (0, 1, 2, 3, 5, 6):
+                values[i] = min(100.0, max(0.0, values[i] + rng.gauss(0, 3)))
+            if rng.random() < 0.01:
+                values[0] = rng.uniform(90, 100)
+            record = {'ts': round(time.time(), 3), 'host': host}
+            for field, value in zip(STAT_FIELDS, values):
+                record[field] = round(value, 1)
+            writer.write(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+            await writer.drain()
+            await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+async def simulate(address, count, interval=1.0, duration=None, seed=None):
+    rng = random.Random(seed)
+    await asyncio.gather(*(
+        simulate_agent(address, f"sim-{i:03d}", interval, rng, duration)
+        for i in range(count)
+    ))
@@ -0,0 +1,257 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from collector import STAT_FIELDS
+
+# Every file starts with a fixed 64 byte header describing the record layout,
+# followed by fixed-width little-endian records: a float64 timestamp and one
+# float32 per field. Seven metrics come to 36 bytes a sample.
+MAGIC = b'PPFL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHH54s')
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_BACKUPS = 4
+DEFAULT_FSYNC_INTERVAL = 10.0
+
+
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_time(text, now=None):
+    # Accepts epoch seconds, ISO datetimes, a wall clock time today ("14:02"),
+    # "now", or an offset back from now ("15m", "now-15m", "-2h"). The
+    # dash-free forms are the ones argparse lets through as positionals.
+    now = time.time() if now is None else now
+    text = text.strip()
+    if text == 'now':
+        return now
+    if text[-1:] in UNIT_SECONDS:
+        amount = text[:-1].removeprefix('now').removeprefix('-')
+        try:
+            return now - float(amount) * UNIT_SECONDS[text[-1]]
+        except ValueError:
+            pass
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if ':' in text and '-' not in text and 'T' not in text:
+        clock = datetime.strptime(text, '%H:%M:%S' if text.count(':') == 2 else '%H:%M')
+        today = datetime.fromtimestamp(now)
+        return today.replace(hour=clock.hour, minute=clock.minute, second=clock.second, microsecond=0).timestamp()
+    return datetime.fromisoformat(text).timestamp()
+
+
+def record_struct(field_count):
+    return struct.Struct('<d' + 'f' * field_count)
+
+
+def rotated_paths(path, backups):
+    # Oldest first, the live file last, same naming as logging's rotating handler
+    return [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+
+
+class FlightLogWriter:
+    # Appends samples to a size-capped set of rotating files. Records are
+    # packed into an in-memory batch and only written + fsynced every
+    # `fsync_interval` seconds (or when the batch gets big), so recording
+    # costs no syscalls on most ticks.
+    def __init__(self, path, fields=STAT_FIELDS, max_bytes=DEFAULT_MAX_BYTES,
+                 backups=DEFAULT_BACKUPS, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        self.path = path
+        self.fields = tuple(fields)
+        self.record = record_struct(len(self.fields))
+        self.max_bytes = max(max_bytes, HEADER.size + self.record.size)
+        self.backups = backups
+        self.fsync_interval = fsync_interval
+        self.batch = bytearray()
+        self.batch_limit = 64 * self.record.size
+        self.lock = threading.Lock()
+        self.last_sync = time.monotonic()
+        self.file = None
+        self.size = 0
+        self.open_file()
+
+    def header_bytes(self):
+        names = ','.join(self.fields).encode('ascii')
+        if len(names) > 54:
+            raise ValueError("too many fields for the flight log header")
+        return HEADER.pack(MAGIC, VERSION, self.record.size, len(self.fields), names)
+
+    def open_file(self):
+        self.file = open(self.path, 'ab')
+        self.size = self.file.seek(0, os.SEEK_END)
+
+        # A file written with a different layout can't be appended to; rotate it away
+        if self.size:
+            try:
+                compatible = read_header(self.path)[1] == self.fields
+            except ValueError:
+                compatible = False
+            if not compatible:
+                self.rotate()
+        else:
+            self.file.write(self.header_bytes())
+            self.size = HEADER.size
+
+    def rotate(self):
+        self.file.close()
+        paths = rotated_paths(self.path, self.backups)
+        if self.backups:
+            if os.path.exists(paths[0]):
+                os.remove(paths[0])
+            for older, newer in zip(paths, paths[1:]):
+                if os.path.exists(newer):
+                    os.replace(newer, older)
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'ab')
+        self.file.write(self.header_bytes())
+        self.size = HEADER.size
+
+    def append(self, timestamp, values):
+        with self.lock:
+            self.batch += self.record.pack(timestamp, *values)
+            if (len(self.batch) >= self.batch_limit
+                    or time.monotonic() - self.last_sync >= self.fsync_interval):
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        self.last_sync = time.monotonic()
+        if not self.batch or self.file is None:
+            return
+        offset = 0
+        while offset < len(self.batch):
+            # Fill the live file up to the cap, rotating on whole-record boundaries
+            room = (self.max_bytes - self.size) // self.record.size * self.record.size
+            if room <= 0:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.rotate()
+                continue
+            written = self.file.write(self.batch[offset:offset + room])
+            self.size += written
+            offset += written
+        self.batch.clear()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: truncated flight log header")
+    magic, version, record_size, field_count, names = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a flight log")
+    fields = tuple(names.rstrip(b'\0').decode('ascii').split(','))
+    if len(fields) != field_count or record_struct(field_count).size != record_size:
+        raise ValueError(f"{path}: corrupt flight log header")
+    return record_size, fields
+
+
+class FlightLogSegment:
+    # One memory-mapped log file. Records are sorted by timestamp, so a time
+    # range is found with a binary search straight over the mapping.
+    def __init__(self, path):
+        self.path = path
+        record_size, self.fields = read_header(path)
+        self.record = record_struct(len(self.fields))
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - HEADER.size) // record_size
+        self.map = None
+        if self.count:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def timestamp(self, index):
+        return struct.unpack_from('<d', self.map, HEADER.size + index * self.record.size)[0]
+
+    def first(self):
+        return self.timestamp(0) if self.count else None
+
+    def last(self):
+        return self.timestamp(self.count - 1) if self.count else None
+
+    def bisect(self, timestamp):
+        # Index of the first record at or after timestamp
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def records(self, start=None, end=None):
+        if not self.count:
+            return
+        index = 0 if start is None else self.bisect(start)
+        unpack = self.record.unpack_from
+        while index < self.count:
+            timestamp, *values = unpack(self.map, HEADER.size + index * self.record.size)
+            if end is not None and timestamp > end:
+                return
+            yield timestamp, values
+            index += 1
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class FlightLogReader:
+    # Reads a recorded time range back across all rotated files of a log.
+    # The per-file index (first/last timestamp) lets whole files be skipped.
+    def __init__(self, path, backups=DEFAULT_BACKUPS):
+        self.segments = []
+        for candidate in rotated_paths(path, backups):
+            if not os.path.exists(candidate):
+                continue
+            segment = FlightLogSegment(candidate)
+            if segment.count:
+                self.segments.append(segment)
+            else:
+                segment.close()
+        self.fields = self.segments[-1].fields if self.segments else tuple(STAT_FIELDS)
+
+    def index(self):
+        return [(s.path, s.first(), s.last(), s.count) for s in self.segments]
+
+    def read(self, start=None, end=None):
+        for segment in self.segments:
+            if start is not None and segment.last() < start:
+                continue
+            if end is not None and segment.first() > end:
+                break
+            yield from segment.records(start, end)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
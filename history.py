@@ -0,0 +1,194 @@
+from array import array
+
+from collector import STAT_FIELDS
+
+# Raw per-second samples kept for 4 hours, then 10 s buckets for a day and
+# 1 min buckets for a week. About 4 MB for all seven metrics, allocated once.
+RAW_CAPACITY = 4 * 3600
+DEFAULT_TIERS = ((10, 24 * 360), (60, 7 * 24 * 60))
+
+
+class RingBuffer:
+    # Fixed-size circular buffer of doubles backed by one preallocated array.
+    # Appends are O(1) and never allocate; reads hand out memoryviews into the
+    # backing store so a window can be consumed without copying.
+    def __init__(self, capacity, typecode='d'):
+        self.capacity = capacity
+        self.data = array(typecode, [0]) * capacity
+        self.head = 0  # next slot to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head += 1
+        if self.head == self.capacity:
+            self.head = 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def last(self, default=None):
+        if not self.count:
+            return default
+        return self.data[self.head - 1]
+
+    def __getitem__(self, index):
+        # Logical index, 0 is the oldest value still held
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("ring buffer index out of range")
+        return self.data[(self.head - self.count + index) % self.capacity]
+
+    def segments(self, n=None):
+        # The newest n values (all by default) as one or two memoryviews,
+        # oldest first. Two views come back when the window wraps around.
+        n = self.count if n is None else min(n, self.count)
+        if n <= 0:
+            return ()
+        view = memoryview(self.data)
+        start = self.head - n
+        if start >= 0:
+            return (view[start:self.head],)
+        if self.head == 0:
+            return (view[start:],)
+        return (view[start + self.capacity:], view[:self.head])
+
+    def as_numpy(self, n=None):
+        # Zero-copy numpy views when the window doesn't wrap, one concatenation when it does.
+        # Imported here: pc loads this module before the window is up, and numpy takes tens of ms
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("numpy is not installed") from None
+        parts = [numpy.frombuffer(segment, dtype=numpy.float64) for segment in self.segments(n)]
+        if not parts:
+            return numpy.empty(0)
+        if len(parts) == 1:
+            return parts[0]
+        return numpy.concatenate(parts)
+
+    def count_since(self, value):
+        # How many of the newest entries are >= value. Only meaningful for
+        # non-decreasing contents such as timestamps; binary search, O(log n).
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.count - lo
+
+
+class RollupTier:
+    # Downsampled min/avg/max buckets of a fixed width in seconds. Values are
+    # accumulated into the open bucket and only written out when time moves
+    # past it, so each add is O(1).
+    def __init__(self, width, capacity, fields):
+        self.width = width
+        self.fields = fields
+        self.timestamps = RingBuffer(capacity)
+        self.columns = {
+            field: {stat: RingBuffer(capacity) for stat in ('min', 'avg', 'max')}
+            for field in fields
+        }
+        self.bucket = None
+        self.reset_bucket()
+
+    def reset_bucket(self):
+        size = len(self.fields)
+        self.weight = 0
+        self.sums = [0.0] * size
+        self.mins = [float('inf')] * size
+        self.maxs = [float('-inf')] * size
+
+    def add(self, timestamp, avgs, mins=None, maxs=None, weight=1):
+        # Feed either raw samples (weight 1, min = max = value) or a finished
+        # bucket from a finer tier. Returns the bucket this call closed, if any.
+        bucket = int(timestamp // self.width)
+        closed = None
+        if self.bucket is not None and bucket != self.bucket:
+            closed = self.flush()
+        self.bucket = bucket
+
+        mins = avgs if mins is None else mins
+        maxs = avgs if maxs is None else maxs
+        for i in range(len(self.fields)):
+            self.sums[i] += avgs[i] * weight
+            if mins[i] < self.mins[i]:
+                self.mins[i] = mins[i]
+            if maxs[i] > self.maxs[i]:
+                self.maxs[i] = maxs[i]
+        self.weight += weight
+        return closed
+
+    def flush(self):
+        if not self.weight:
+            return None
+        timestamp = self.bucket * self.width
+        avgs = [total / self.weight for total in self.sums]
+        closed = (timestamp, avgs, self.mins, self.maxs, self.weight)
+
+        self.timestamps.append(timestamp)
+        for i, field in enumerate(self.fields):
+            column = self.columns[field]
+            column['min'].append(self.mins[i])
+            column['avg'].append(avgs[i])
+            column['max'].append(self.maxs[i])
+        self.reset_bucket()
+        return closed
+
+    def column(self, field, stat='avg'):
+        return self.columns[field][stat]
+
+
+class HistoryStore:
+    # Columnar history for the sampled metrics: one shared timestamp ring and
+    # one value ring per metric, plus progressively coarser rollup tiers.
+    def __init__(self, fields=STAT_FIELDS, capacity=RAW_CAPACITY, tiers=DEFAULT_TIERS):
+        self.fields = tuple(fields)
+        self.timestamps = RingBuffer(capacity)
+        self.columns = {field: RingBuffer(capacity) for field in self.fields}
+        self.tiers = [RollupTier(width, size, self.fields) for width, size in tiers]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, values):
+        # values line up with self.fields
+        self.timestamps.append(timestamp)
+        for field, value in zip(self.fields, values):
+            self.columns[field].append(value)
+
+        # Cascade: a bucket closing in one tier is a single sample for the next
+        closed = self.tiers[0].add(timestamp, values) if self.tiers else None
+        for tier in self.tiers[1:]:
+            if closed is None:
+                break
+            bucket_ts, avgs, mins, maxs, weight = closed
+            closed = tier.add(bucket_ts, avgs, mins, maxs, weight)
+
+    def column(self, field):
+        return self.columns[field]
+
+    def latest(self, field, n=None):
+        # Zero-copy view(s) of the newest n raw samples of one metric
+        return self.columns[field].segments(n)
+
+    def window(self, field, seconds, now=None):
+        # Raw samples from the last `seconds`, as memoryview segments
+        now = self.timestamps.last(0) if now is None else now
+        return self.columns[field].segments(self.timestamps.count_since(now - seconds))
+
+    def tier(self, width):
+        for tier in self.tiers:
+            if tier.width == width:
+                return tier
+        raise KeyError(f"no {width}s rollup tier")
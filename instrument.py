@@ -0,0 +1,98 @@
+import time
+
+from sources import load_psutil
+
+# How often the Tk heartbeat fires while the diagnostics footer is on
+HEARTBEAT_MS = 1000
+
+
+class RunningStat:
+    # Last, mean and worst of a duration series, in milliseconds
+    __slots__ = ('last', 'count', 'total', 'peak')
+
+    def __init__(self):
+        self.last = 0.0
+        self.count = 0
+        self.total = 0.0
+        self.peak = 0.0
+
+    def add(self, ms):
+        self.last = ms
+        self.count += 1
+        self.total += ms
+        if ms > self.peak:
+            self.peak = ms
+
+    def as_dict(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {'last': round(self.last, 3), 'mean': round(mean, 3), 'max': round(self.peak, 3), 'count': self.count}
+
+
+def pending_after_count(root):
+    # Timers Tk is holding right now; None when the interpreter can't say
+    try:
+        return len(root.tk.splitlist(root.tk.call('after', 'info')))
+    except Exception:
+        return None
+
+
+class Instruments:
+    # The detector's own health: how long each probe and the redraw take, how
+    # long a sample waits in the Tk queue before it is drawn, how late the
+    # Tk loop runs its timers, and what the process itself costs. Written from
+    # the monitor thread and the Tk thread, read by whoever calls snapshot().
+    def __init__(self):
+        self.stats = {}
+        self.pending_after = None
+        self.process = load_psutil().Process()
+        self.prev_cpu = None
+        self.prev_time = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+
+    def record(self, name, seconds):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = RunningStat()
+        stat.add(seconds * 1000)
+
+    def record_probes(self, probe_times, sample_time):
+        # Probes overlap on their workers, so the tick is timed on its own
+        for probe, seconds in probe_times.items():
+            self.record(f'probe.{probe}', seconds)
+        self.record('sample', sample_time)
+
+    def sample_self(self):
+        # Own CPU % since the previous call, and resident memory
+        now = time.monotonic()
+        with self.process.oneshot():
+            times = self.process.cpu_times()
+            self.rss = self.process.memory_info().rss
+        used = times.user + times.system
+        if self.prev_time is not None and now > self.prev_time:
+            self.cpu_percent = (used - self.prev_cpu) / (now - self.prev_time) * 100
+        self.prev_cpu = used
+        self.prev_time = now
+
+    def snapshot(self):
+        return {
+            'timings_ms': {name: stat.as_dict() for name, stat in sorted(self.stats.items())},
+            'pending_after': self.pending_after,
+            'self_cpu_percent': round(self.cpu_percent, 2),
+            'self_rss_bytes': self.rss,
+        }
+
+    def last(self, name):
+        stat = self.stats.get(name)
+        return stat.last if stat is not None else 0.0
+
+    def summary(self):
+        # Two short lines for the footer: where the time goes, then what we cost
+        text = (
+            f"sample {self.last('sample'):.1f}ms  draw {self.last('update_display'):.1f}ms  "
+            f"queue {self.last('sample_to_display'):.0f}ms  lag {self.last('loop_lag'):.0f}ms\n"
+            f"self {self.cpu_percent:.1f}% CPU  {self.rss / 1024 / 1024:.0f}MB"
+        )
+        if self.pending_after is not None:
+            text += f"  {self.pending_after} timers"
+        return text
@@ -0,0 +1,210 @@
+from bisect import bisect_left, bisect_right
+
+# System status data with funny messages
+MOOD_DATA = {
+    'cpu': [
+        {'threshold': 30, 'emoji': "😴", 'message': "CPU chilling: Everything's smooth, no stress."},
+        {'threshold': 50, 'emoji': "😊", 'message': "CPU okay: Running fine, nothing crazy."},
+        {'threshold': 70, 'emoji': "😅", 'message': "CPU sweating: Doing some heavy lifting, but coping."},
+        {'threshold': 85, 'emoji': "😰", 'message': "CPU stressed: Close some apps or it will explode!"},
+        {'threshold': 95, 'emoji': "🔥", 'message': "CPU on fire: Run! Save your work NOW!"}
+    ],
+    'ram': [
+        {'threshold': 40, 'emoji': "💾", 'message': "RAM happy: Plenty of memory, smooth sailing."},
+        {'threshold': 65, 'emoji': "🤔", 'message': "RAM thinking: Could slow down if you open more stuff."},
+        {'threshold': 85, 'emoji': "😵", 'message': "RAM stressed: Might lag soon, be careful."},
+        {'threshold': 95, 'emoji': "💀", 'message': "RAM dead tired: Close some programs or face doom!"}
+    ],
+    'disk': [
+        {'threshold': 50, 'emoji': "📁", 'message': "Disk healthy: Plenty of space, all good."},
+        {'threshold': 80, 'emoji': "🍔", 'message': "Disk full-ish: Maybe clean some junk."},
+        {'threshold': 95, 'emoji': "🎈", 'message': "Disk about to pop: Free some space ASAP!"}
+    ],
+    # Used instead of 'disk' when I/O saturation, not free space, is the problem
+    'disk_io': [
+        {'threshold': 50, 'emoji': "📀", 'message': "Disk humming: Some reading and writing, all under control."},
+        {'threshold': 80, 'emoji': "🥵", 'message': "Disk grinding: Anything that touches files will feel slow."},
+        {'threshold': 95, 'emoji': "🧱", 'message': "Disk jammed: The I/O queue is full, apps are waiting in line."}
+    ],
+    'network': [
+        {'threshold': 30, 'emoji': "🚀", 'message': "Network flying: Fast and smooth."},
+        {'threshold': 60, 'emoji': "🚗", 'message': "Network normal: Works fine, nothing to worry about."},
+        {'threshold': 80, 'emoji': "🐢", 'message': "Network crawling: Things loading slow, patience."},
+        {'threshold': 95, 'emoji': "☠️", 'message': "Network dead: Might need a restart or check cables."}
+    ],
+    # Pressure stall information: how much of the time something was stuck waiting
+    'psi': [
+        {'threshold': 0, 'emoji': "🧘", 'message': "No waiting: Nothing is stuck in line, everything flows."},
+        {'threshold': 10, 'emoji': "⏳", 'message': "Some queueing: Programs wait their turn now and then."},
+        {'threshold': 30, 'emoji': "🚦", 'message': "Stalling: Apps keep waiting on CPU, memory or disk. You'll feel it."},
+        {'threshold': 60, 'emoji': "🧊", 'message': "Frozen solid: Everything is stuck waiting. It's not you, it's the machine."}
+    ],
+    # Hottest sensor against its own limit
+    'thermal': [
+        {'threshold': 0, 'emoji': "❄️", 'message': "Cool and quiet: Plenty of thermal headroom."},
+        {'threshold': 60, 'emoji': "🌡️", 'message': "Warming up: Running warm, still within limits."},
+        {'threshold': 80, 'emoji': "♨️", 'message': "Running hot: Close to its temperature limit. Check the vents."},
+        {'threshold': 95, 'emoji': "🌋", 'message': "Meltdown territory: At its thermal limit, give it a break."}
+    ],
+    # Used instead of 'thermal' when the CPU is cutting its own clock to cool down
+    'throttled': [
+        {'threshold': 0, 'emoji': "🐌", 'message': "Throttling: Too hot to run full speed, so everything slows down."},
+        {'threshold': 95, 'emoji': "🫠", 'message': "Throttled hard: The CPU is cooking and has cut its own speed. Let it breathe."}
+    ],
+    'battery': [
+        {'threshold': 15, 'emoji': "🪫", 'message': "Battery empty: Plug in NOW or bye-bye PC."},
+        {'threshold': 30, 'emoji': "🔴", 'message': "Battery low: Better save your work."},
+        {'threshold': 80, 'emoji': "🟡", 'message': "Battery okay: Still got juice, keep going."},
+        {'threshold': 101, 'emoji': "🟢", 'message': "Battery full: Party time, fully charged!"}
+    ]
+}
+
+
+def severity(cpu, ram, disk, network, battery, psi=0.0, thermal=0.0):
+    # Single 0-100 "how bad is it" score used to rank machines against each other
+    score = max(cpu, ram, disk, network, psi, thermal)
+    if battery <= 15:
+        score = max(score, 100 - battery)
+    return score
+
+
+# A level or category is only left once the reading is this many points past
+# the threshold that got it there
+HYSTERESIS_MARGIN = 5.0
+# Consecutive samples a new mood has to hold before it is shown
+DWELL_SAMPLES = 2
+# Emoji animation tiers: bounce from 70%, shake from 90%
+ANIMATION_THRESHOLDS = (0, 70, 90)
+ANIMATIONS = (None, 'bounce', 'shake')
+
+
+class ThresholdTable:
+    # One mood_data list compiled into sorted thresholds for bisect, with
+    # enter/exit hysteresis: a level is entered at its threshold but only left
+    # downwards once the value is `margin` below it.
+    __slots__ = ('thresholds', 'entries', 'margin')
+
+    def __init__(self, thresholds, entries, margin=HYSTERESIS_MARGIN):
+        self.thresholds = list(thresholds)
+        self.entries = list(entries)
+        self.margin = margin
+
+    @classmethod
+    def from_moods(cls, moods, margin=HYSTERESIS_MARGIN):
+        return cls([mood['threshold'] for mood in moods], moods, margin)
+
+    def level(self, value, current=None):
+        # Below the first threshold still means the first entry
+        level = max(bisect_right(self.thresholds, value) - 1, 0)
+        if current is not None and level < current:
+            level = max(level, min(current, bisect_right(self.thresholds, value + self.margin) - 1))
+        return level
+
+
+class ThresholdLatch:
+    # A single on/off version of the same rules: on at `threshold`, off once
+    # `margin` below it, and either change only after it held for `dwell`
+    # samples. Used for per-bar effects like the high-usage pulse.
+    __slots__ = ('table', 'dwell', 'on', 'pending_count')
+
+    def __init__(self, threshold, margin=HYSTERESIS_MARGIN, dwell=DWELL_SAMPLES):
+        self.table = ThresholdTable((0, threshold), (False, True), margin)
+        self.dwell = dwell
+        self.on = False
+        self.pending_count = 0
+
+    def update(self, value):
+        wanted = self.table.entries[self.table.level(value, int(self.on))]
+        if wanted == self.on:
+            self.pending_count = 0
+        else:
+            self.pending_count += 1
+            if self.pending_count >= self.dwell:
+                self.on = wanted
+                self.pending_count = 0
+        return self.on
+
+
+class MoodEngine:
+    # Picks the mood to show from a sample's readings. mood_data is
+    # compiled once into bisect tables, readings should be smoothed already
+    # (see streaming.StreamingStats), and the shown mood changes only when a
+    # new one has held for `dwell` samples and cleared the hysteresis band.
+    def __init__(self, mood_data=MOOD_DATA, margin=HYSTERESIS_MARGIN, dwell=DWELL_SAMPLES):
+        self.margin = margin
+        self.dwell = dwell
+        self.tables = {category: ThresholdTable.from_moods(moods, margin) for category, moods in mood_data.items()}
+        self.default = self.tables['cpu']
+        battery = mood_data['battery']
+        self.battery_critical = battery[0]['threshold']
+        # Battery moods are picked by the first threshold the charge is under
+        self.battery_thresholds = [mood['threshold'] for mood in battery]
+        self.battery_moods = battery
+        self.animations = ThresholdTable(ANIMATION_THRESHOLDS, ANIMATIONS, margin)
+        self.reset()
+
+    def reset(self):
+        self.state = None  # (category, level, animation level)
+        self.metric = None
+        self.pending = None
+        self.pending_count = 0
+
+    def pick_metric(self, usage):
+        # Highest reading wins, but the current one keeps the title until beaten by `margin`
+        best = max(usage, key=usage.get)
+        if self.metric is not None and usage[best] <= usage[self.metric] + self.margin:
+            return self.metric
+        return best
+
+    def update(self, cpu, ram, disk, network, battery, psi=0.0, thermal=0.0, disk_cause='space',
+               thermal_cause='heat'):
+        # -> (category, value, mood, animation) for what should be on screen
+        usage = {'cpu': cpu, 'ram': ram, 'disk': disk, 'network': network, 'psi': psi, 'thermal': thermal}
+        metric = self.pick_metric(usage)
+        value = usage[metric]
+        category = metric
+        if metric == 'disk' and disk_cause == 'io':
+            category = 'disk_io'
+        elif metric == 'thermal' and thermal_cause == 'throttle':
+            category = 'throttled'
+
+        current = self.state
+        # Hysteresis is per table; a new category starts from its plain level
+        same = current is not None and current[0] == category
+        critical = battery <= self.battery_critical or (
+            current is not None and current[0] == 'battery' and battery <= self.battery_critical + self.margin
+        )
+        if critical:
+            candidate = ('battery', bisect_left(self.battery_thresholds, battery), len(ANIMATIONS) - 1)
+        else:
+            table = self.tables.get(category, self.default)
+            candidate = (
+                category,
+                table.level(value, current[1] if same else None),
+                self.animations.level(value, current[2] if current is not None else None),
+            )
+
+        if current is None or candidate == current:
+            self.commit(candidate, metric)
+        elif candidate == self.pending:
+            self.pending_count += 1
+            if self.pending_count >= self.dwell:
+                self.commit(candidate, metric)
+        else:
+            self.pending = candidate
+            self.pending_count = 1
+            if self.dwell <= 1:
+                self.commit(candidate, metric)
+
+        category, level, animation = self.state
+        if category == 'battery':
+            mood = self.battery_moods[min(level, len(self.battery_moods) - 1)]
+        else:
+            mood = self.tables.get(category, self.default).entries[level]
+        return category, usage[self.metric], mood, ANIMATIONS[animation]
+
+    def commit(self, state, metric):
+        self.state = state
+        self.metric = metric
+        self.pending = None
+        self.pending_count = 0
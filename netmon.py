@@ -0,0 +1,117 @@
+import time
+
+from sources import load_psutil
+
+# Interfaces that only carry traffic already counted on a physical NIC (or
+# never leave the box). Matched as name prefixes; override per host if needed.
+VIRTUAL_PREFIXES = (
+    'lo', 'docker', 'veth', 'br-', 'virbr', 'vmnet', 'vboxnet', 'cni', 'flannel',
+    'cali', 'ifb', 'tun', 'tap', 'wg', 'tailscale', 'zt', 'utun', 'awdl', 'llw',
+    'Loopback', 'vEthernet', 'isatap', 'Teredo',
+)
+
+# Link speed assumed when the driver doesn't report one (Wi-Fi, most VMs), Mbit/s
+DEFAULT_CAPACITY_MBPS = 100
+# net_if_stats() costs an ioctl per interface, link speeds rarely change
+IF_STATS_REFRESH = 30.0
+
+
+def parse_capacity(specs):
+    # ["eth0=10000", "1000"] -> ({'eth0': 10000.0}, 1000.0); values in Mbit/s
+    per_nic = {}
+    default = None
+    for spec in specs or ():
+        name, sep, value = spec.rpartition('=')
+        if sep:
+            per_nic[name] = float(value)
+        else:
+            default = float(value)
+    return per_nic, default
+
+
+class NicRates:
+    __slots__ = ('name', 'rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+                 'errors', 'drops', 'capacity', 'utilization')
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class NetworkMonitor:
+    # Per-interface throughput from net_io_counters(pernic=True) deltas,
+    # normalised against each link's speed. The reported network % is the
+    # saturation of the busiest physical link in its busiest direction, so
+    # 10 MB/s is ~1% on a 10 GbE host and ~80% on 100 Mbit Wi-Fi.
+    def __init__(self, source, capacity=None, default_capacity=None, exclude=VIRTUAL_PREFIXES, include=(),
+                 clock=time.monotonic):
+        self.source = source
+        self.clock = clock
+        self.capacity = dict(capacity or {})  # nic -> Mbit/s, wins over the driver
+        self.default_capacity = default_capacity or DEFAULT_CAPACITY_MBPS
+        self.exclude = tuple(exclude)
+        self.include = set(include)  # names always monitored, even if they look virtual
+        self.if_stats = {}
+        self.if_stats_at = None
+        self.prev = source.net_io()
+        self.prev_time = clock()
+        self.rates = {}
+        self.percent = 0.0
+
+    def wanted(self, name):
+        if name in self.include:
+            return True
+        return not name.startswith(self.exclude)
+
+    def refresh_if_stats(self, now):
+        if self.if_stats_at is None or now - self.if_stats_at >= IF_STATS_REFRESH:
+            try:
+                self.if_stats = load_psutil().net_if_stats()
+            except OSError:
+                self.if_stats = {}
+            self.if_stats_at = now
+
+    def link_capacity(self, name):
+        # Bytes per second for one direction of the link
+        mbps = self.capacity.get(name)
+        if mbps is None:
+            stats = self.if_stats.get(name)
+            mbps = stats.speed if stats is not None and stats.speed > 0 else self.default_capacity
+        return mbps * 1_000_000 / 8
+
+    def sample(self, now=None):
+        now = self.clock() if now is None else now
+        elapsed = now - self.prev_time
+        current = self.source.net_io()
+        if elapsed <= 0:
+            return self.percent
+        self.refresh_if_stats(now)
+
+        rates = {}
+        busiest = 0.0
+        for name, counters in current.items():
+            previous = self.prev.get(name)
+            if previous is None or not self.wanted(name):
+                continue
+            stats = self.if_stats.get(name)
+            if stats is not None and not stats.isup:
+                continue
+
+            nic = NicRates()
+            nic.name = name
+            # Counters can reset when a link bounces; treat that tick as idle
+            nic.rx_bytes = max(counters.bytes_recv - previous.bytes_recv, 0) / elapsed
+            nic.tx_bytes = max(counters.bytes_sent - previous.bytes_sent, 0) / elapsed
+            nic.rx_packets = max(counters.packets_recv - previous.packets_recv, 0) / elapsed
+            nic.tx_packets = max(counters.packets_sent - previous.packets_sent, 0) / elapsed
+            nic.errors = max(counters.errin + counters.errout - previous.errin - previous.errout, 0) / elapsed
+            nic.drops = max(counters.dropin + counters.dropout - previous.dropin - previous.dropout, 0) / elapsed
+            nic.capacity = self.link_capacity(name)
+            nic.utilization = min(max(nic.rx_bytes, nic.tx_bytes) / nic.capacity * 100, 100.0)
+            rates[name] = nic
+            busiest = max(busiest, nic.utilization)
+
+        self.prev = current
+        self.prev_time = now
+        self.rates = rates
+        self.percent = busiest
+        return busiest
@@ -1,17 +1,130 @@
-import tkinter as tk
-from tkinter import ttk
-import psutil
+import argparse
+import sys
 import time
 import threading
-from collections import deque
-import platform
 import math
 
+import collector
+from collector import AdaptiveInterval, SystemSampler
+from history import HistoryStore
+from moods import HYSTERESIS_MARGIN, MOOD_DATA, MoodEngine, ThresholdLatch
+from psimon import PressureTrigger
+from render import Renderer
+from instrument import HEARTBEAT_MS, Instruments, pending_after_count
+from streaming import StreamingStats
+
+# tkinter is loaded on demand so the headless modes never import Tk
+tk = None
+
+WINDOW_WIDTH = 500
+WINDOW_HEIGHT = 750
+
+# Sparkline geometry: last 60 samples drawn into a small canvas next to each value
+SPARKLINE_POINTS = 60
+SPARKLINE_WIDTH = 90
+SPARKLINE_HEIGHT = 24
+
+# All animations share one timer running at this rate
+ANIMATION_FPS = 20
+# How long the footer loader spins after a new sample lands
+LOADER_SPIN_FRAMES = 20
+
+# Process attribution costs up to 15 ms, so it doesn't follow the fast cadence
+PROCESS_SCAN_INTERVAL = 1.0
+# Back-off after a failed sample
+MONITOR_ERROR_DELAY = 5.0
+# Delay between the pre-seeded first reading and the monitor's first sample,
+# long enough for the CPU counters to say something real
+FIRST_SAMPLE_DELAY = 0.25
+# Value colour for readings whose probe missed its deadline this tick
+STALE_COLOR = '#707070'
+
+# Progress bars: height, width assumed until the first <Configure>, and the
+# fill colour per stat (battery overrides it by charge level)
+BAR_HEIGHT = 6
+DEFAULT_BAR_WIDTH = 150
+BAR_COLORS = {
+    'cpu': '#6464ff',  # Purple
+    'ram': '#ffb446',  # Yellow
+    'disk': '#ff4646',  # Red
+    'network': '#70c0ff',  # Blue
+    'battery': '#46dc78',  # Green
+    'psi': '#d070ff',  # Magenta
+    'thermal': '#ff8040',  # Orange
+}
+# Smoothed reading at which a bar starts pulsing red
+PULSE_THRESHOLD = 90
+
+
+class FrameScheduler:
+    # Drives every animation from a single Tk `after` timer. Animations are
+    # callbacks registered under a name and called every `every` frames; a
+    # callback returning False unregisters itself. The timer only exists while
+    # something is registered and the window is visible, so an idle or hidden
+    # widget produces no wakeups at all.
+    def __init__(self, root, fps=ANIMATION_FPS):
+        self.root = root
+        self.frame_ms = max(1, int(1000 / fps))
+        self.animations = {}
+        self.timer = None
+        self.paused = False
+        self.frame = 0
+        
+    def register(self, name, callback, every=1):
+        self.animations[name] = (callback, every)
+        self.wake()
+        
+    def cancel(self, name):
+        self.animations.pop(name, None)
+        if not self.animations:
+            self.stop_timer()
+            
+    def is_running(self, name):
+        return name in self.animations
+        
+    def pause(self):
+        self.paused = True
+        self.stop_timer()
+        
+    def resume(self):
+        self.paused = False
+        self.wake()
+        
+    def wake(self):
+        if self.timer is None and not self.paused and self.animations:
+            self.timer = self.root.after(self.frame_ms, self.tick)
+            
+    def stop_timer(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+            
+    def tick(self):
+        self.timer = None
+        self.frame += 1
+        for name, (callback, every) in list(self.animations.items()):
+            if self.frame % every:
+                continue
+            if callback(self.frame) is False:
+                self.animations.pop(name, None)
+        self.wake()
+
+
+def load_tk():
+    global tk
+    if tk is None:
+        import tkinter
+        tk = tkinter
+    return tk
+
+
 class ComputerMoodDetector:
-    def __init__(self):
+    def __init__(self, recorder=None, monitor=True, sampler=None, exporter=None, pacer=None, instruments=None,
+                 make_sampler=SystemSampler, defer_startup=False):
+        load_tk()
         self.root = tk.Tk()
         self.root.title("Perfomance Police Detector")
-        self.root.geometry("500x650")
+        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.root.resizable(False, False)
         self.root.configure(bg='#0f0f1f')
         
@@ -19,51 +132,69 @@ class ComputerMoodDetector:
         self.root.overrideredirect(True)
         
         # System status data with funny messages
-        self.mood_data = {
-            'cpu': [
-                {'threshold': 30, 'emoji': "😴", 'message': "CPU chilling: Everything's smooth, no stress."},
-                {'threshold': 50, 'emoji': "😊", 'message': "CPU okay: Running fine, nothing crazy."},
-                {'threshold': 70, 'emoji': "😅", 'message': "CPU sweating: Doing some heavy lifting, but coping."},
-                {'threshold': 85, 'emoji': "😰", 'message': "CPU stressed: Close some apps or it will explode!"},
-                {'threshold': 95, 'emoji': "🔥", 'message': "CPU on fire: Run! Save your work NOW!"}
-            ],
-            'ram': [
-                {'threshold': 40, 'emoji': "💾", 'message': "RAM happy: Plenty of memory, smooth sailing."},
-                {'threshold': 65, 'emoji': "🤔", 'message': "RAM thinking: Could slow down if you open more stuff."},
-                {'threshold': 85, 'emoji': "😵", 'message': "RAM stressed: Might lag soon, be careful."},
-                {'threshold': 95, 'emoji': "💀", 'message': "RAM dead tired: Close some programs or face doom!"}
-            ],
-            'disk': [
-                {'threshold': 50, 'emoji': "📁", 'message': "Disk healthy: Plenty of space, all good."},
-                {'threshold': 80, 'emoji': "🍔", 'message': "Disk full-ish: Maybe clean some junk."},
-                {'threshold': 95, 'emoji': "🎈", 'message': "Disk about to pop: Free some space ASAP!"}
-            ],
-            'network': [
-                {'threshold': 30, 'emoji': "🚀", 'message': "Network flying: Fast and smooth."},
-                {'threshold': 60, 'emoji': "🚗", 'message': "Network normal: Works fine, nothing to worry about."},
-                {'threshold': 80, 'emoji': "🐢", 'message': "Network crawling: Things loading slow, patience."},
-                {'threshold': 95, 'emoji': "☠️", 'message': "Network dead: Might need a restart or check cables."}
-            ],
-            'battery': [
-                {'threshold': 15, 'emoji': "🪫", 'message': "Battery empty: Plug in NOW or bye-bye PC."},
-                {'threshold': 30, 'emoji': "🔴", 'message': "Battery low: Better save your work."},
-                {'threshold': 80, 'emoji': "🟡", 'message': "Battery okay: Still got juice, keep going."},
-                {'threshold': 101, 'emoji': "🟢", 'message': "Battery full: Party time, fully charged!"}
-            ]
-        }
-        
-        # Store previous values for network calculation
-        self.prev_net_io = psutil.net_io_counters()
-        self.prev_time = time.time()
-        self.network_speeds = deque(maxlen=10)
+        self.mood_data = MOOD_DATA
+        
+        # Sampling lives in collector.py so it can also run without a window;
+        # built by finish_startup (after the first frame) unless handed in
+        self.sampler = sampler
+        self.make_sampler = make_sampler
+        self.history = HistoryStore()
+        # Moods follow smoothed readings with hysteresis so one noisy sample can't flip them
+        self.streaming = StreamingStats()
+        self.mood_engine = MoodEngine(self.mood_data)
+        self.recorder = recorder  # optional flightlog.FlightLogWriter
+        self.exporter = exporter  # optional exporter.MetricsExporter, fed from the monitor thread
+        
+        # Top CPU/RAM consumers, refreshed by the monitor thread
+        self.process_scanner = None
+        self.process_top = ([], [])
+        
+        # Sampling cadence: slow when calm, fast when hot; set sample_now to skip the wait
+        self.pacer = pacer or AdaptiveInterval()
+        self.sample_now = threading.Event()
+        self.pressure_trigger = None
+        self.stale_fields = frozenset()
+        
+        # Our own cost and responsiveness; shown in the footer with --instrument
+        self.instruments = instruments
+        self.heartbeat_timer = None
+        self.heartbeat_due = None
         
         # Animation states
+        self.scheduler = FrameScheduler(self.root)
         self.emoji_animation = None
-        self.animation_running = False
         
+        # Last drawn state of every widget property a sample can change
+        self.renderer = Renderer()
+        self.bar_widths = {}
+        self.bar_values = {}
+        # High-usage pulses follow the smoothed reading, with the mood's hysteresis and dwell
+        self.pulse_latches = {stat_type: ThresholdLatch(PULSE_THRESHOLD) for stat_type in BAR_COLORS}
+        
+        # The window shell goes up first; with defer_startup the rest waits
+        # for run() to get it on screen, which is what a hotkey launch feels
         self.setup_ui()
         self.setup_bindings()
-        self.start_monitoring()
+        self.live = monitor
+        self.started = False
+        if not defer_startup:
+            self.finish_startup()
+            
+    def finish_startup(self):
+        # Everything the first frame can do without: psutil, the counter
+        # baselines the sampler takes, the stat grid and the monitor thread
+        if self.instruments is None:
+            self.instruments = Instruments()
+        self.setup_stats()
+        if self.live:
+            from processes import ProcessScanner
+            if self.sampler is None:
+                self.sampler = self.make_sampler()
+            self.process_scanner = ProcessScanner()
+            # Pre-seed the display with a first reading instead of "Initializing..."
+            self.deliver_sample(time.perf_counter(), self.sampler.get_system_stats(), self.sampler.stale)
+            self.start_monitoring(first_delay=FIRST_SAMPLE_DELAY)
+        self.started = True
         
     def setup_ui(self):
         # Main container with gradient background
@@ -75,7 +206,7 @@ class ComputerMoodDetector:
         
         # Main window frame
         self.window_frame = tk.Frame(self.main_canvas, bg='#191923', bd=0, relief='flat')
-        self.window_frame.place(relx=0.5, rely=0.5, anchor='center', width=460, height=600)
+        self.window_frame.place(relx=0.5, rely=0.5, anchor='center', width=460, height=WINDOW_HEIGHT - 50)
         
         # Create window border effect
         self.create_window_border()
@@ -128,24 +259,8 @@ class ComputerMoodDetector:
             justify='center'
         )
         self.message_label.pack(pady=(0, 20), padx=20)
-        
-        # Stats grid - now 3x2 for battery
-        self.stats_frame = tk.Frame(self.status_container, bg='#191923')
-        self.stats_frame.pack(fill='both', expand=True)
-        
-        # Configure grid for 3 rows and 2 columns
-        self.stats_frame.columnconfigure(0, weight=1)
-        self.stats_frame.columnconfigure(1, weight=1)
-        self.stats_frame.rowconfigure(0, weight=1)
-        self.stats_frame.rowconfigure(1, weight=1)
-        self.stats_frame.rowconfigure(2, weight=1)
-        
-        # Create stat widgets including battery
-        self.cpu_stat = self.create_stat_widget("CPU Usage", 0, 0, 'cpu')
-        self.ram_stat = self.create_stat_widget("RAM Usage", 0, 1, 'ram')
-        self.disk_stat = self.create_stat_widget("Disk Usage", 1, 0, 'disk')
-        self.network_stat = self.create_stat_widget("Network", 1, 1, 'network')
-        self.battery_stat = self.create_stat_widget("Battery", 2, 0, 'battery')
+        self.renderer.bind('emoji', lambda text: self.emoji_label.configure(text=text))
+        self.renderer.bind('message', lambda text: self.message_label.configure(text=text))
         
         # Footer
         self.footer = tk.Frame(self.window_frame, bg='#191923')
@@ -169,19 +284,64 @@ class ComputerMoodDetector:
         )
         self.footer_label.pack(side='left')
         
-        # Start loader animation
+        # Loader spins briefly whenever a sample arrives
         self.loader_angle = 0
-        self.animate_loader()
+        self.loader_frames_left = 0
+        self.loader_arc = self.loader_canvas.create_arc(
+            2, 2, 18, 18,
+            start=self.loader_angle, extent=300,
+            outline='#6464ff', width=2,
+            style='arc'
+        )
+        
+    def setup_stats(self):
+        # Which processes are to blame; only shown when CPU or RAM is stressed
+        self.top_label = tk.Label(
+            self.mood_display,
+            text="",
+            font=('Segoe UI', 9),
+            fg='#b0b0b0',
+            bg='#0a0a12',
+            wraplength=400,
+            justify='left'
+        )
+        self.top_visible = False
+        self.renderer.bind('top', lambda text: self.top_label.configure(text=text))
+        
+        # Stats grid - 3x2 plus a full-width thermal row
+        self.stats_frame = tk.Frame(self.status_container, bg='#191923')
+        self.stats_frame.pack(fill='both', expand=True)
+        
+        # Configure grid for 4 rows and 2 columns
+        self.stats_frame.columnconfigure(0, weight=1)
+        self.stats_frame.columnconfigure(1, weight=1)
+        self.stats_frame.rowconfigure(0, weight=1)
+        self.stats_frame.rowconfigure(1, weight=1)
+        self.stats_frame.rowconfigure(2, weight=1)
+        self.stats_frame.rowconfigure(3, weight=1)
+        
+        # Create stat widgets including battery
+        self.sparkline_visible = {}
+        step = SPARKLINE_WIDTH / (SPARKLINE_POINTS - 1)
+        self.sparkline_xs = [round(i * step, 1) for i in range(SPARKLINE_POINTS)]
+        self.cpu_stat = self.create_stat_widget("CPU Usage", 0, 0, 'cpu')
+        self.ram_stat = self.create_stat_widget("RAM Usage", 0, 1, 'ram')
+        self.disk_stat = self.create_stat_widget("Disk Usage", 1, 0, 'disk')
+        self.network_stat = self.create_stat_widget("Network", 1, 1, 'network')
+        self.battery_stat = self.create_stat_widget("Battery", 2, 0, 'battery')
+        self.psi_stat = self.create_stat_widget("Stalls (PSI)", 2, 1, 'psi')
+        self.thermal_stat = self.create_stat_widget("Thermal", 3, 0, 'thermal', columnspan=2)
         
     def draw_gradient_background(self):
-        # Create a simple gradient effect using rectangles
+        # Create a simple gradient effect using rectangles; the window can't be
+        # resized, so its own height is enough (no screen size round trip)
         colors = ['#0f0f1f', '#1a1a2f', '#2d1a4a']
-        height = self.root.winfo_screenheight()
+        height = WINDOW_HEIGHT
         
         for i, color in enumerate(colors):
             y1 = i * height // len(colors)
             y2 = (i + 1) * height // len(colors)
-            self.main_canvas.create_rectangle(0, y1, 500, y2, fill=color, outline='')
+            self.main_canvas.create_rectangle(0, y1, WINDOW_WIDTH, y2, fill=color, outline='')
         
     def create_window_border(self):
         # Create border effect using canvas
@@ -206,19 +366,19 @@ class ComputerMoodDetector:
         if type == 'close':
             btn.bind('<Button-1>', lambda e: self.root.quit())
         elif type == 'minimize':
-            btn.bind('<Button-1>', lambda e: self.root.withdraw())
+            btn.bind('<Button-1>', lambda e: self.hide_window())
             
         btn.bind('<Enter>', lambda e: btn.configure(cursor='hand2'))
         return btn
         
-    def create_stat_widget(self, title, row, col, stat_type):
+    def create_stat_widget(self, title, row, col, stat_type, columnspan=1):
         frame = tk.Frame(
             self.stats_frame,
             bg='#0a0a12',
             relief='flat',
             bd=1
         )
-        frame.grid(row=row, column=col, padx=5, pady=5, sticky='nsew')
+        frame.grid(row=row, column=col, columnspan=columnspan, padx=5, pady=5, sticky='nsew')
         frame.configure(highlightbackground='#333344', highlightthickness=1)
         
         # Title
@@ -231,48 +391,90 @@ class ComputerMoodDetector:
         )
         title_label.pack(anchor='w', padx=15, pady=(15, 5))
         
-        # Value
+        # Value row: number on the left, history sparkline on the right
+        value_row = tk.Frame(frame, bg='#0a0a12')
+        value_row.pack(fill='x', padx=15, pady=5)
+        
         value_var = tk.StringVar(value="0%")
         value_label = tk.Label(
-            frame,
+            value_row,
             textvariable=value_var,
             font=('Segoe UI', 16, 'bold'),
             fg='white',
             bg='#0a0a12'
         )
-        value_label.pack(anchor='w', padx=15, pady=5)
+        value_label.pack(side='left')
+        
+        sparkline_canvas = tk.Canvas(
+            value_row,
+            width=SPARKLINE_WIDTH,
+            height=SPARKLINE_HEIGHT,
+            bg='#0a0a12',
+            highlightthickness=0
+        )
+        sparkline_canvas.pack(side='right')
+        
+        # One polyline item that only ever gets new coordinates, never recreated
+        baseline = SPARKLINE_HEIGHT - 2
+        sparkline = sparkline_canvas.create_line(
+            0, baseline, SPARKLINE_WIDTH, baseline,
+            fill='#6464ff', width=1
+        )
+        
+        # Click a widget to toggle its sparkline
+        for widget in (frame, title_label, value_row, value_label, sparkline_canvas):
+            widget.bind('<Button-1>', lambda e, s=stat_type: self.toggle_sparkline(s))
         
         # Progress bar container
-        progress_container = tk.Frame(frame, bg='#1a1a1a', height=6)
+        progress_container = tk.Frame(frame, bg='#1a1a1a', height=BAR_HEIGHT)
         progress_container.pack(fill='x', padx=15, pady=(5, 15))
         progress_container.pack_propagate(False)
         
-        # Progress bar canvas
+        # Progress bar canvas with one rectangle that is only ever resized and recoloured
         progress_canvas = tk.Canvas(
             progress_container,
-            height=6,
+            height=BAR_HEIGHT,
             bg='#1a1a1a',
             highlightthickness=0
         )
         progress_canvas.pack(fill='x')
+        bar = progress_canvas.create_rectangle(
+            0, 0, 0, BAR_HEIGHT,
+            fill=BAR_COLORS[stat_type], outline='',
+            tags="progress"
+        )
+        # Width comes from <Configure> rather than a winfo_width() round trip per sample
+        self.bar_widths[stat_type] = DEFAULT_BAR_WIDTH
+        progress_canvas.bind('<Configure>', lambda e, s=stat_type: self.on_bar_resize(s, e.width))
         
         # Store references
-        setattr(self, f"{stat_type}_value", value_var)
         setattr(self, f"{stat_type}_progress", progress_canvas)
+        setattr(self, f"{stat_type}_sparkline", (sparkline_canvas, sparkline))
+        self.sparkline_visible[stat_type] = True
+        
+        renderer = self.renderer
+        renderer.bind((stat_type, 'text'), value_var.set)
+        renderer.bind((stat_type, 'fg'), lambda fg: value_label.configure(fg=fg))
+        renderer.bind((stat_type, 'bar'), lambda px: progress_canvas.coords(bar, 0, 0, px, BAR_HEIGHT))
+        renderer.bind((stat_type, 'bar_color'), lambda color: progress_canvas.itemconfigure(bar, fill=color))
+        renderer.bind((stat_type, 'sparkline'), lambda coords: sparkline_canvas.coords(sparkline, *coords))
         
         return frame
         
-    def animate_loader(self):
-        self.loader_canvas.delete("all")
-        # Draw loader arc
-        self.loader_canvas.create_arc(
-            2, 2, 18, 18,
-            start=self.loader_angle, extent=300,
-            outline='#6464ff', width=2,
-            style='arc'
-        )
+    def spin_loader(self):
+        self.loader_frames_left = LOADER_SPIN_FRAMES
+        if not self.scheduler.is_running('loader'):
+            self.scheduler.register('loader', self.animate_loader)
+            
+    def animate_loader(self, frame):
         self.loader_angle = (self.loader_angle + 20) % 360
-        self.root.after(50, self.animate_loader)
+        self.loader_canvas.itemconfig(self.loader_arc, start=self.loader_angle)
+        self.loader_frames_left -= 1
+        return self.loader_frames_left > 0
+        
+    def hide_window(self):
+        self.root.withdraw()
+        self.scheduler.pause()
         
     def setup_bindings(self):
         # Make window draggable
@@ -285,6 +487,23 @@ class ComputerMoodDetector:
         self.title_bar.bind('<Double-Button-1>', lambda e: self.root.quit())
         self.title_label.bind('<Double-Button-1>', lambda e: self.root.quit())
         
+        # Stop animating entirely while the window isn't mapped
+        self.root.bind('<Unmap>', self.on_visibility_change)
+        self.root.bind('<Map>', self.on_visibility_change)
+        
+    def on_visibility_change(self, event):
+        if event.widget is not self.root:
+            return
+        if str(event.type) == 'Unmap':
+            self.scheduler.pause()
+            self.stop_heartbeat()
+        else:
+            self.scheduler.resume()
+            if self.heartbeat_due is not None and self.heartbeat_timer is None:
+                self.start_heartbeat()
+            # Whatever is on screen may be 15 s old after an idle stretch
+            self.sample_now.set()
+        
     def start_move(self, event):
         self.x = event.x
         self.y = event.y
@@ -297,143 +516,132 @@ class ComputerMoodDetector:
         self.root.geometry(f"+{x}+{y}")
         
     def get_system_stats(self):
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=0.5)
-        
-        # RAM usage
-        ram = psutil.virtual_memory()
-        ram_percent = ram.percent
-        
-        # Disk usage
-        try:
-            disk = psutil.disk_usage('/')
-            disk_percent = disk.percent
-        except:
-            try:
-                disk = psutil.disk_usage('C:/')
-                disk_percent = disk.percent
-            except:
-                disk_percent = 0
-        
-        # Network usage
-        current_net_io = psutil.net_io_counters()
-        current_time = time.time()
-        time_diff = current_time - self.prev_time
-        
-        if time_diff > 0:
-            bytes_sent = current_net_io.bytes_sent - self.prev_net_io.bytes_sent
-            bytes_recv = current_net_io.bytes_recv - self.prev_net_io.bytes_recv
-            
-            # Convert to MB/s and create a 0-100 scale
-            total_speed = (bytes_sent + bytes_recv) / time_diff / 1024 / 1024
-            network_percent = min(total_speed * 10, 100)
-            
-            self.network_speeds.append(network_percent)
-            network_avg = sum(self.network_speeds) / len(self.network_speeds) if self.network_speeds else 0
-            
-            self.prev_net_io = current_net_io
-            self.prev_time = current_time
-        else:
-            network_avg = 0
-        
-        # Battery status
-        try:
-            battery = psutil.sensors_battery()
-            if battery:
-                battery_percent = battery.percent
-                # If plugged in, show as "full" for mood purposes
-                if battery.power_plugged:
-                    battery_percent = 100
-            else:
-                battery_percent = 100  # Assume desktop PC
-        except:
-            battery_percent = 100  # Default for systems without battery
-            
-        return cpu_percent, ram_percent, disk_percent, network_avg, battery_percent
+        return self.sampler.get_system_stats()
     
-    def update_display(self, cpu, ram, disk, network, battery):
-        # Update progress bars and values
-        self.update_progress_bar('cpu', cpu)
-        self.update_progress_bar('ram', ram)
-        self.update_progress_bar('disk', disk)
-        self.update_progress_bar('network', network)
-        self.update_progress_bar('battery', battery)
-        
-        # Determine overall mood based on highest usage (excluding battery for overall mood)
-        max_usage = max(cpu, ram, disk, network)
-        mood_category = 'cpu'
-        
-        if max_usage == ram:
-            mood_category = 'ram'
-        elif max_usage == disk:
-            mood_category = 'disk'
-        elif max_usage == network:
-            mood_category = 'network'
-            
-        self.update_mood_display(mood_category, max_usage, battery)
-        
-    def update_progress_bar(self, stat_type, value):
-        value_var = getattr(self, f"{stat_type}_value")
-        canvas = getattr(self, f"{stat_type}_progress")
+    def update_display(self, cpu, ram, disk, network, battery, psi=0.0, thermal=0.0, timestamp=None):
+        # Keep every reading around for graphs and exporters
+        if timestamp is None:
+            timestamp = time.time()
+        self.history.append(timestamp, (cpu, ram, disk, network, battery, psi, thermal))
+        self.render_stats(cpu, ram, disk, network, battery, psi, thermal, timestamp)
+        
+    def render_stats(self, cpu, ram, disk, network, battery, psi=0.0, thermal=0.0, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        readings = (cpu, ram, disk, network, battery, psi, thermal)
+        smoothed = self.streaming.update(timestamp, readings)
+        disk_cause, thermal_cause = self.mood_causes()
+        
+        # Stage everything the sample changes, then draw only what differs from the screen
+        for stat_type, value, trend in zip(self.streaming.fields, readings, smoothed):
+            self.update_progress_bar(stat_type, value, trend)
+        
+        for stat_type in self.history.fields:
+            self.update_sparkline(stat_type)
+            self.renderer.set(
+                (stat_type, 'fg'), STALE_COLOR if stat_type in self.stale_fields else 'white'
+            )
+        
+        # Overall mood follows the highest smoothed usage (battery only when it's critical)
+        self.update_mood_display(*self.mood_engine.update(*smoothed, disk_cause, thermal_cause))
+        
+        # Nothing new on screen, nothing to spin for
+        if self.renderer.flush():
+            self.spin_loader()
+        
+    def mood_causes(self):
+        # Whether a high disk reading is space or I/O, and heat or throttling; only a live sampler knows
+        if self.live:
+            return self.sampler.disk.cause, self.sampler.thermal.cause
+        return 'space', 'heat'
+        
+    def update_progress_bar(self, stat_type, value, smoothed=None):
+        renderer = self.renderer
         
         # Format value display based on type
         if stat_type == 'battery':
-            value_var.set(f"{value:.0f}%")
+            renderer.set((stat_type, 'text'), f"{value:.0f}%")
         else:
-            value_var.set(f"{value:.1f}%")
-        
-        # Clear previous progress
-        canvas.delete("progress")
-        
-        # Calculate width based on value
-        width = canvas.winfo_width()
-        if width <= 1:  # Canvas not yet rendered
-            width = 150  # Default width
-            
-        progress_width = (value / 100) * width
-        
-        # Define colors based on stat type
-        colors = {
-            'cpu': ('#46dc78', '#6464ff'),  # Green to Purple
-            'ram': ('#46dc78', '#ffb446'),  # Green to Yellow
-            'disk': ('#46dc78', '#ff4646'), # Green to Red
-            'network': ('#46dc78', '#70c0ff'), # Green to Blue
-            'battery': ('#46dc78', '#ffb446') # Green to Yellow for battery
-        }
+            renderer.set((stat_type, 'text'), f"{value:.1f}%")
         
-        color1, color2 = colors.get(stat_type, ('#46dc78', '#6464ff'))
+        self.bar_values[stat_type] = value
+        renderer.set((stat_type, 'bar'), round(value / 100 * self.bar_widths[stat_type]))
         
         # Special handling for battery - different color based on level
+        color = BAR_COLORS[stat_type]
         if stat_type == 'battery':
             if value <= 15:
-                color2 = '#ff4646'  # Red for low battery
+                color = '#ff4646'  # Red for low battery
             elif value <= 30:
-                color2 = '#ffb446'  # Orange for warning
-            else:
-                color2 = '#46dc78'  # Green for good battery
-        
-        # Draw progress bar
-        canvas.create_rectangle(
-            0, 0, progress_width, 6,
-            fill=color2, outline='',
-            tags="progress"
-        )
-        
-        # Add animation for high usage (except battery)
-        if value > 90 and stat_type != 'battery' and not hasattr(self, f'{stat_type}_pulse'):
-            setattr(self, f'{stat_type}_pulse', True)
-            self.pulse_animation(canvas, stat_type, 0)
-        elif (value <= 90 or stat_type == 'battery') and hasattr(self, f'{stat_type}_pulse'):
-            setattr(self, f'{stat_type}_pulse', False)
+                color = '#ffb446'  # Orange for warning
+        
+        # Add animation for sustained high usage (except battery); one pulse per stat at most
+        pulse_name = f'pulse_{stat_type}'
+        pulsing = self.scheduler.is_running(pulse_name)
+        hot = self.pulse_latches[stat_type].update(value if smoothed is None else smoothed)
+        if stat_type != 'battery' and hot:
+            if not pulsing:
+                canvas = getattr(self, f"{stat_type}_progress")
+                self.scheduler.register(
+                    pulse_name,
+                    lambda frame: self.pulse_animation(canvas, frame),
+                    every=2
+                )
+            # The pulse owns the fill while it runs
+            renderer.forget((stat_type, 'bar_color'))
+            return
+        if pulsing:
+            self.scheduler.cancel(pulse_name)
+        renderer.set((stat_type, 'bar_color'), color)
+            
+    def on_bar_resize(self, stat_type, width):
+        if width <= 1 or width == self.bar_widths[stat_type]:
+            return
+        self.bar_widths[stat_type] = width
+        value = self.bar_values.get(stat_type)
+        if value is not None:
+            self.renderer.set((stat_type, 'bar'), round(value / 100 * width))
+            self.renderer.flush()
             
-    def pulse_animation(self, canvas, stat_type, phase):
-        if not hasattr(self, f'{stat_type}_pulse') or not getattr(self, f'{stat_type}_pulse'):
+    def update_sparkline(self, stat_type):
+        if not self.sparkline_visible.get(stat_type):
             return
+        canvas, line = getattr(self, f"{stat_type}_sparkline")
+        
+        # Read straight out of the ring buffer: one or two memoryviews, no copy
+        segments = self.history.latest(stat_type, SPARKLINE_POINTS)
+        count = sum(len(segment) for segment in segments)
+        if not count:
+            return
+            
+        # Right-align the points so new samples always enter at the right edge
+        xs = iter(self.sparkline_xs[SPARKLINE_POINTS - max(count, 2):])
+        scale = (SPARKLINE_HEIGHT - 4) / 100
+        coords = []
+        for segment in segments:
+            for value in segment:
+                coords.append(next(xs))
+                coords.append(SPARKLINE_HEIGHT - 2 - min(max(value, 0), 100) * scale)
+        if count == 1:
+            coords.extend((next(xs), coords[1]))  # a line needs two points
+        self.renderer.set((stat_type, 'sparkline'), tuple(coords))
+        
+    def toggle_sparkline(self, stat_type):
+        canvas, line = getattr(self, f"{stat_type}_sparkline")
+        visible = not self.sparkline_visible[stat_type]
+        self.sparkline_visible[stat_type] = visible
+        if visible:
+            canvas.pack(side='right')
+            self.update_sparkline(stat_type)
+            self.renderer.flush()
+        else:
+            canvas.pack_forget()
             
+    def pulse_animation(self, canvas, frame):
         # Simple pulse effect by adjusting opacity (simulated with color brightness)
+        phase = frame * 0.25
         intensity = 0.7 + 0.3 * math.sin(phase)
         canvas.itemconfig("progress", fill=self.adjust_color_brightness('#ff4646', intensity))
-        self.root.after(100, lambda: self.pulse_animation(canvas, stat_type, phase + 0.5))
         
     def adjust_color_brightness(self, color, factor):
         # Convert hex to RGB
@@ -446,67 +654,66 @@ class ComputerMoodDetector:
         # Convert back to hex
         return '#{:02x}{:02x}{:02x}'.format(*new_rgb)
         
-    def update_mood_display(self, category, value, battery):
-        # Check battery first for critical low battery
-        if battery <= 15:
-            moods = self.mood_data.get('battery', self.mood_data['cpu'])
-            selected_mood = moods[0]  # Default to first battery mood
-        else:
-            moods = self.mood_data.get(category, self.mood_data['cpu'])
-            selected_mood = moods[0]  # Default to first mood in category
+    def update_mood_display(self, category, value, mood, animation):
+        self.renderer.set('emoji', mood['emoji'])
+        self.renderer.set('message', mood['message'])
+        self.update_top_processes(category, value)
         
-        # Find the appropriate mood based on thresholds
-        for mood in moods:
-            if value >= mood['threshold']:
-                selected_mood = mood
-                
-        # Override with battery mood if battery is critical
-        if battery <= 15:
-            battery_moods = self.mood_data['battery']
-            for mood in battery_moods:
-                if battery <= mood['threshold']:
-                    selected_mood = mood
-                    break
-                
-        self.emoji_label.configure(text=selected_mood['emoji'])
-        self.message_label.configure(text=selected_mood['message'])
-        
-        # Update emoji animation based on stress level
-        if value > 90 or battery <= 15:
-            self.add_emoji_animation('shake')
-        elif value > 70:
-            self.add_emoji_animation('bounce')
+        # Emoji animation follows the engine's stress level, which has its own hysteresis
+        if animation is not None:
+            self.add_emoji_animation(animation)
         else:
             self.remove_emoji_animation()
             
+    def update_top_processes(self, category, value):
+        # "CPU on fire" is always followed by "which process?", so answer it
+        show = category in ('cpu', 'ram') and value > 70 and any(self.process_top)
+        if show:
+            from processes import format_top
+            self.renderer.set('top', format_top(*self.process_top))
+            if not self.top_visible:
+                self.message_label.pack_configure(pady=(0, 5))
+                self.top_label.pack(pady=(0, 15), padx=20, after=self.message_label)
+        elif self.top_visible:
+            self.top_label.pack_forget()
+            self.message_label.pack_configure(pady=(0, 20))
+        self.top_visible = show
+        
     def add_emoji_animation(self, animation_type):
         if self.emoji_animation == animation_type:
             return
             
+        self.reset_emoji_position()
         self.emoji_animation = animation_type
-        self.animation_running = True
         
         if animation_type == 'shake':
-            self.shake_emoji(0)
+            self.scheduler.register('emoji', self.shake_emoji)
         elif animation_type == 'bounce':
-            self.bounce_emoji(0, True)
+            self.bounce_step = 0
+            self.bounce_going_up = True
+            self.scheduler.register('emoji', self.bounce_emoji, every=2)
             
     def remove_emoji_animation(self):
+        if self.emoji_animation is None:
+            return
+        self.scheduler.cancel('emoji')
+        self.reset_emoji_position()
         self.emoji_animation = None
-        self.animation_running = False
         
-    def shake_emoji(self, offset):
-        if not self.animation_running or self.emoji_animation != 'shake':
-            return
-            
-        x_offset = math.sin(offset * 8) * 3
+    def reset_emoji_position(self):
+        # Shake moves the label with place(); hand it back to pack where it started
+        if self.emoji_animation == 'shake':
+            self.emoji_label.place_forget()
+        self.emoji_label.pack(pady=(20, 10), before=self.message_label)
+        
+    def shake_emoji(self, frame):
+        x_offset = math.sin(frame * 8) * 3
         self.emoji_label.place(x=x_offset)  # Simple shake effect
-        self.root.after(50, lambda: self.shake_emoji(offset + 1))
         
-    def bounce_emoji(self, step, going_up):
-        if not self.animation_running or self.emoji_animation != 'bounce':
-            return
-            
+    def bounce_emoji(self, frame):
+        step = self.bounce_step
+        going_up = self.bounce_going_up
+        
         if going_up:
             y_offset = -5
             if step >= 5:
@@ -522,23 +729,108 @@ class ComputerMoodDetector:
             else:
                 step += 1
                 
+        self.bounce_step = step
+        self.bounce_going_up = going_up
         self.emoji_label.pack(pady=(20 + y_offset, 10))
-        self.root.after(100, lambda: self.bounce_emoji(step, going_up))
         
-    def start_monitoring(self):
+    def start_monitoring(self, first_delay=0.0):
         def monitor():
+            # Deadlines on the monotonic clock so a slow sample doesn't push later ones back
+            if first_delay and self.sample_now.wait(first_delay):
+                self.sample_now.clear()
+            next_tick = time.monotonic()
+            last_scan = None
             while True:
                 try:
-                    cpu, ram, disk, network, battery = self.get_system_stats()
-                    self.root.after(0, self.update_display, cpu, ram, disk, network, battery)
-                    time.sleep(3)  # Update every 3 seconds
+                    stats = self.get_system_stats()
+                    self.instruments.record_probes(self.sampler.probe_times, self.sampler.sample_time)
+                    if self.recorder is not None:
+                        self.recorder.append(self.sampler.last_timestamp, stats)
+                    if self.exporter is not None:
+                        self.exporter.publish(
+                            self.sampler.last_timestamp, stats, self.sampler.disk.cause, self.sampler.thermal.cause
+                        )
+                    now = time.monotonic()
+                    if last_scan is None or now - last_scan >= PROCESS_SCAN_INTERVAL:
+                        self.process_top = self.process_scanner.scan()
+                        last_scan = now
+                    self.root.after(0, self.deliver_sample, time.perf_counter(), stats, self.sampler.stale)
+                    interval = self.pacer.next_interval(stats)
                 except Exception as e:
                     print(f"Monitoring error: {e}")
-                    time.sleep(5)
+                    interval = MONITOR_ERROR_DELAY
+                    
+                next_tick += interval
+                delay = next_tick - time.monotonic()
+                if delay <= 0:
+                    # Fell behind, start counting from now instead of bursting
+                    next_tick = time.monotonic()
+                    continue
+                if self.sample_now.wait(delay):
+                    self.sample_now.clear()
+                    next_tick = time.monotonic()
                     
         monitor_thread = threading.Thread(target=monitor, daemon=True)
         monitor_thread.start()
         
+        # Let the kernel wake the monitor the moment tasks start stalling
+        if self.sampler.pressure.available:
+            self.pressure_trigger = PressureTrigger(
+                self.sampler.source.pressure_files(), lambda resource: self.sample_now.set()
+            )
+            self.pressure_trigger.start()
+        
+    def deliver_sample(self, posted, stats, stale=frozenset()):
+        # Runs on the Tk thread: how long the sample sat in the queue, then how long drawing it took
+        started = time.perf_counter()
+        self.instruments.record('sample_to_display', started - posted)
+        # Readings carried over because their probe timed out are drawn greyed out
+        self.stale_fields = stale
+        self.update_display(*stats)
+        self.instruments.record('update_display', time.perf_counter() - started)
+        
+    def start_heartbeat(self):
+        # A timer that should fire every HEARTBEAT_MS; how late it actually runs is the loop lag
+        self.heartbeat_due = time.perf_counter() + HEARTBEAT_MS / 1000
+        self.heartbeat_timer = self.root.after(HEARTBEAT_MS, self.heartbeat)
+        
+    def stop_heartbeat(self):
+        if self.heartbeat_timer is not None:
+            self.root.after_cancel(self.heartbeat_timer)
+            self.heartbeat_timer = None
+            
+    def heartbeat(self):
+        self.heartbeat_timer = None
+        self.instruments.record('loop_lag', max(time.perf_counter() - self.heartbeat_due, 0.0))
+        self.instruments.pending_after = pending_after_count(self.root)
+        # Our own CPU and memory: a few syscalls, so once a second here rather than on every sample
+        self.instruments.sample_self()
+        self.footer_label.configure(text=self.instruments.summary(), justify='left')
+        self.start_heartbeat()
+        
+    def start_replay(self, records, speed=1.0):
+        # Feed recorded samples through update_display with their original spacing
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            self.footer_label.configure(text="Nothing recorded in that range")
+            return
+        self.play_record(records, first, speed)
+        
+    def play_record(self, records, record, speed):
+        timestamp, values = record
+        self.update_display(*values, timestamp=timestamp)
+        self.footer_label.configure(
+            text=f"Replaying {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}"
+        )
+        
+        upcoming = next(records, None)
+        if upcoming is None:
+            self.footer_label.configure(text="Replay finished")
+            return
+        delay = max(0.0, (upcoming[0] - timestamp) / speed)
+        self.root.after(int(delay * 1000), self.play_record, records, upcoming, speed)
+        
     def run(self):
         # Center the window on screen
         self.root.update_idletasks()
@@ -548,8 +840,188 @@ class ComputerMoodDetector:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
         
+        if not self.started:
+            # Paint the shell, then build the rest behind it
+            self.root.update()
+            self.finish_startup()
         self.root.mainloop()
+        
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.exporter is not None:
+            self.exporter.close()
+        if self.pressure_trigger is not None:
+            self.pressure_trigger.close()
+        if self.sampler is not None:
+            self.sampler.close()
+
+class FleetDashboard(ComputerMoodDetector):
+    # Same window, but fed by a fleet aggregator: it always shows whichever
+    # host is in the worst mood right now, with the runners-up in the footer.
+    # Each host keeps its own smoothing and mood state, and a sample is only
+    # drawn once, however many refreshes pass before the next one arrives.
+    def __init__(self, aggregator, address):
+        self.aggregator = aggregator
+        self.address = address
+        self.current = None  # HostState on screen
+        self.drawn_timestamp = None
+        self.host_moods = {}  # host -> (StreamingStats, MoodEngine)
+        super().__init__(monitor=False)
+        self.title_label.configure(text="Performance Police: fleet")
+        self.footer_label.configure(text=f"Waiting for agents on {address}...")
+        self.refresh_fleet()
+        
+    def refresh_fleet(self):
+        live, offline = self.aggregator.ranking()
+        if live:
+            shown = self.pick_host(live)
+            if shown is not self.current:
+                # Sparklines read straight from the host's own ring buffers
+                self.current = shown
+                self.drawn_timestamp = None
+                self.history = shown.history
+                # Don't smooth one host's readings into another's
+                moods = self.host_moods.get(shown.host)
+                if moods is None:
+                    moods = self.host_moods[shown.host] = (StreamingStats(), MoodEngine(self.mood_data))
+                self.streaming, self.mood_engine = moods
+                self.title_label.configure(text=shown.host)
+            if shown.timestamp != self.drawn_timestamp:
+                self.drawn_timestamp = shown.timestamp
+                self.render_stats(*shown.latest, timestamp=shown.timestamp)
+            
+            summary = f"{len(live)} hosts"
+            if offline:
+                summary += f", {offline} offline"
+            others = [state for state in live if state is not shown][:3]
+            runners_up = ", ".join(f"{state.host} {state.severity:.0f}%" for state in others)
+            if runners_up:
+                summary += f" | next: {runners_up}"
+            self.footer_label.configure(text=summary)
+        self.root.after(1000, self.refresh_fleet)
+        
+    def pick_host(self, live):
+        # The worst host takes over only once it's worse by the mood hysteresis margin
+        worst = live[0]
+        current = self.current
+        if current is None or current is worst or current not in live:
+            return worst
+        if worst.severity > current.severity + HYSTERESIS_MARGIN:
+            return worst
+        return current
+        
+    def mood_causes(self):
+        if self.current is None:
+            return 'space', 'heat'
+        return self.current.disk_cause, self.current.thermal_cause
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pc.py', description="Performance Police desktop widget")
+    parser.add_argument('--record', metavar='PATH', help="append every sample to a binary flight log")
+    parser.add_argument('--metrics', metavar='[HOST:]PORT', help="serve /metrics for Prometheus on this address")
+    parser.add_argument('--instrument', action='store_true',
+                        help="show the widget's own sampling cost, redraw time and loop lag in the footer")
+    parser.add_argument('--interval', dest='fixed_interval', type=float, metavar='SECONDS',
+                        help="sample on a fixed period instead of adapting to load")
+    parser.add_argument('--hot-threshold', type=float, default=collector.HOT_THRESHOLD, metavar='PCT',
+                        help="usage at which sampling speeds up to every 250 ms")
+    collector.add_sampler_arguments(parser)
+    commands = parser.add_subparsers(dest='command')
+    
+    collector.build_parser(commands.add_parser('collect', help="headless sampling to stdout or a file"))
+    # Options are bench.build_parser's; main() hands them over without importing bench up front
+    commands.add_parser('bench', add_help=False, help="benchmark the sampler and renderer, JSON results")
+    
+    replay = commands.add_parser('replay', help="play a recorded flight log range through the UI")
+    replay.add_argument('log', help="flight log path given to --record")
+    replay.add_argument('start', nargs='?',
+                        help="epoch, ISO time, HH:MM today, or 15m / now-15m back from now (default: oldest)")
+    replay.add_argument('end', nargs='?', help="same formats as start, or now (default: newest)")
+    replay.add_argument('--speed', type=float, default=1.0, help="playback speed multiplier")
+    
+    agent = commands.add_parser('agent', help="stream samples to a fleet aggregator")
+    agent.add_argument('--connect', help="host:port or unix:/path (default :9311)")
+    agent.add_argument('-i', '--interval', type=float, default=1.0, help="seconds between samples")
+    
+    for name, text in (('aggregate', "collect agents headlessly and print a summary"),
+                       ('dashboard', "collect agents and show the worst host")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('--listen', help="host:port or unix:/path (default :9311)")
+        
+    simulate = commands.add_parser('simulate', help="run fake agents against an aggregator")
+    simulate.add_argument('--connect', help="host:port or unix:/path (default :9311)")
+    simulate.add_argument('-n', '--agents', type=int, default=50, help="number of simulated hosts")
+    simulate.add_argument('-i', '--interval', type=float, default=1.0, help="seconds between samples")
+    simulate.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    
+    if args.command == 'bench':
+        # The benchmark harness is only loaded for its own subcommand, not on every launch
+        import bench
+        return bench.main(extra)
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    
+    if args.command == 'collect':
+        return collector.run(args)
+    
+    if args.command in ('agent', 'aggregate', 'simulate'):
+        import asyncio
+        import fleet
+        if args.command == 'agent':
+            fleet.run_agent(fleet.parse_address(args.connect), interval=args.interval)
+        elif args.command == 'aggregate':
+            asyncio.run(fleet.serve_forever(fleet.parse_address(args.listen)))
+        else:
+            asyncio.run(fleet.simulate(
+                fleet.parse_address(args.connect), args.agents, args.interval, args.duration
+            ))
+        return 0
+    
+    if args.command == 'dashboard':
+        import fleet
+        address = fleet.parse_address(args.listen)
+        aggregator = fleet.FleetAggregator()
+        aggregator.start_in_thread(address)
+        FleetDashboard(aggregator, fleet.format_address(address)).run()
+        return 0
+    
+    if args.command == 'replay':
+        from flightlog import FlightLogReader, parse_time
+        try:
+            start = parse_time(args.start) if args.start else None
+            end = parse_time(args.end) if args.end else None
+        except ValueError as e:
+            parser.error(f"replay: {e}")
+        reader = FlightLogReader(args.log)
+        app = ComputerMoodDetector(monitor=False)
+        app.start_replay(reader.read(start, end), speed=args.speed)
+        app.run()
+        reader.close()
+        return 0
+    
+    recorder = None
+    if args.record:
+        from flightlog import FlightLogWriter
+        recorder = FlightLogWriter(args.record)
+    exporter = collector.start_exporter(args.metrics)
+    
+    if args.fixed_interval:
+        interval = args.fixed_interval
+        pacer = AdaptiveInterval(idle=interval, normal=interval, hot=interval)
+    else:
+        pacer = AdaptiveInterval(hot_threshold=args.hot_threshold)
+    
+    app = ComputerMoodDetector(recorder=recorder, make_sampler=lambda: collector.build_sampler(args),
+                               exporter=exporter, pacer=pacer, defer_startup=True)
+    if args.instrument:
+        app.start_heartbeat()
+    app.run()
+    return 0
 
 if __name__ == "__main__":
-    app = ComputerMoodDetector()
-    app.run()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+
+# How long a tick waits for a probe before publishing its last good value instead
+DEFAULT_DEADLINE = 0.25
+
+
+class Probe:
+    # One reading the sampler takes each tick. `every` > 0 gives a probe its
+    # own slower cadence (the last value is reused in between), `inline`
+    # probes run on the sampling thread itself, and `default` stands in when
+    # a probe has never produced a value.
+    __slots__ = ('name', 'func', 'deadline', 'every', 'inline', 'default',
+                 'value', 'updated_at', 'pending', 'duration')
+
+    def __init__(self, name, func, deadline=DEFAULT_DEADLINE, every=0.0, inline=False, default=0.0):
+        self.name = name
+        self.func = func
+        self.deadline = deadline
+        self.every = every
+        self.inline = inline
+        self.default = default
+        self.value = None
+        self.updated_at = None
+        self.pending = None
+        self.duration = 0.0
+
+    def call(self, now):
+        started = time.perf_counter()
+        try:
+            return self.func(now)
+        finally:
+            self.duration = time.perf_counter() - started
+
+    def due(self, now):
+        return self.value is None or self.every <= 0 or now - self.updated_at >= self.every
+
+    def store(self, value, now):
+        self.value = value
+        self.updated_at = now
+
+    def refresh(self, now):
+        # Run on the calling thread; a failure keeps the last good value and returns False
+        try:
+            value = self.call(now)
+        except Exception:
+            return False
+        self.store(value, now)
+        return True
+
+    def current(self):
+        return self.default if self.value is None else self.value
+
+
+class ProbeCall:
+    # The outcome of one probe run, filled in by its worker. A bare Event
+    # instead of concurrent.futures, which would cost the widget ~5 ms of
+    # imports at startup.
+    __slots__ = ('finished', 'value', 'error')
+
+    def __init__(self):
+        self.finished = threading.Event()
+        self.value = None
+        self.error = None
+
+    def done(self):
+        return self.finished.is_set()
+
+    def result(self, timeout=None):
+        if not self.finished.wait(timeout):
+            raise TimeoutError
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ProbeWorker(threading.Thread):
+    # A daemon thread that only ever runs one probe. Giving every slow probe
+    # its own worker means a call stuck in the kernel (statvfs on a dead NFS
+    # server, battery firmware) can only ever hold up itself, and a daemon
+    # thread never keeps the process alive on exit the way a
+    # ThreadPoolExecutor worker would.
+    def __init__(self, probe):
+        super().__init__(name=f"probe-{probe.name}", daemon=True)
+        self.probe = probe
+        self.requests = queue.SimpleQueue()
+
+    def submit(self, now):
+        call = ProbeCall()
+        self.requests.put((call, now))
+        return call
+
+    def run(self):
+        while True:
+            call, now = self.requests.get()
+            if call is None:
+                return
+            try:
+                call.value = self.probe.call(now)
+            except Exception as e:
+                call.error = e
+            call.finished.set()
+
+    def stop(self):
+        self.requests.put((None, None))
+
+
+class ProbeExecutor:
+    # Runs a tick's probes concurrently, each against its own deadline.
+    # Probes that miss it (or fail) publish their last good value and are
+    # listed in `stale`; a probe still stuck from an earlier tick isn't
+    # started again until it comes back, so nothing piles up behind it.
+    # Inline probes (cheap reads that can't block, like /proc/stat) run on
+    # the calling thread while the others are in flight.
+    def __init__(self, probes):
+        self.probes = list(probes)
+        self.workers = {}
+        for probe in self.probes:
+            if not probe.inline:
+                worker = self.workers[probe.name] = ProbeWorker(probe)
+                worker.start()
+        self.stale = set()
+
+    def harvest(self, probe, now):
+        # Pick up a result that arrived after an earlier tick gave up on it
+        call = probe.pending
+        if call is None or not call.done():
+            return
+        probe.pending = None
+        if call.error is None:
+            probe.store(call.value, now)
+
+    def run(self, now):
+        started = time.monotonic()
+        values = {}
+        stale = set()
+
+        waiting = []
+        for probe in self.probes:
+            if probe.inline:
+                continue
+            self.harvest(probe, now)
+            if probe.pending is not None:
+                stale.add(probe.name)  # still stuck on an earlier tick
+            elif probe.due(now):
+                probe.pending = self.workers[probe.name].submit(now)
+                waiting.append(probe)
+
+        for probe in self.probes:
+            if probe.inline and probe.due(now) and not probe.refresh(now):
+                stale.add(probe.name)  # a transient parse error mustn't take the sampler down
+
+        for probe in sorted(waiting, key=lambda probe: probe.deadline):
+            remaining = started + probe.deadline - time.monotonic()
+            try:
+                value = probe.pending.result(timeout=max(remaining, 0.0))
+            except TimeoutError:
+                stale.add(probe.name)
+                continue
+            except Exception:
+                probe.pending = None
+                stale.add(probe.name)
+                continue
+            probe.pending = None
+            probe.store(value, now)
+
+        for probe in self.probes:
+            values[probe.name] = probe.current()
+        self.stale = stale
+        return values
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.stop()
@@ -0,0 +1,130 @@
+import heapq
+import time
+from collections import deque
+
+import psutil
+
+# Wall time the scanner may spend per tick. Whatever doesn't fit is picked up
+# on the next tick, so a box with thousands of processes costs the same per
+# tick as a laptop, it just takes a few ticks to sweep every process once.
+DEFAULT_BUDGET = 0.015
+DEFAULT_TOP_N = 5
+
+GONE = (psutil.NoSuchProcess, psutil.ZombieProcess)
+
+
+class ProcessEntry:
+    __slots__ = ('pid', 'handle', 'name', 'cpu_total', 'sampled_at', 'cpu_percent', 'rss', 'denied')
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.handle = None
+        self.name = None
+        self.cpu_total = 0.0
+        self.sampled_at = None
+        self.cpu_percent = None
+        self.rss = 0
+        self.denied = False
+
+
+class ProcessScanner:
+    # Incremental per-process attribution. psutil.Process handles are kept
+    # across ticks, CPU% comes from the cpu_times() delta between two of our
+    # own visits, and each visit fetches only cpu_times + memory_info inside
+    # oneshot(). Visits are round-robin under a time budget, with the current
+    # top consumers revisited first so the ranking stays fresh.
+    def __init__(self, budget=DEFAULT_BUDGET, top_n=DEFAULT_TOP_N):
+        self.budget = budget
+        self.top_n = top_n
+        self.entries = {}
+        self.queue = deque()
+        self.cpu_top = []
+        self.rss_top = []
+        self.last_cost = 0.0
+        self.last_visited = 0
+
+    def refresh_pids(self):
+        pids = set(psutil.pids())
+        for pid in pids.difference(self.entries):
+            entry = ProcessEntry(pid)
+            self.entries[pid] = entry
+            # New processes go to the front so they get a baseline quickly
+            self.queue.appendleft(entry)
+        for pid in set(self.entries).difference(pids):
+            del self.entries[pid]
+
+    def visit(self, entry):
+        try:
+            if entry.handle is None:
+                entry.handle = psutil.Process(entry.pid)
+                entry.name = entry.handle.name()
+            with entry.handle.oneshot():
+                times = entry.handle.cpu_times()
+                rss = entry.handle.memory_info().rss
+        except GONE:
+            self.entries.pop(entry.pid, None)
+            return
+        except psutil.AccessDenied:
+            entry.denied = True
+            return
+
+        now = time.monotonic()
+        total = times.user + times.system
+        if entry.sampled_at is not None and now > entry.sampled_at:
+            entry.cpu_percent = max(0.0, (total - entry.cpu_total) / (now - entry.sampled_at) * 100)
+        entry.cpu_total = total
+        entry.sampled_at = now
+        entry.rss = rss
+
+    def scan(self):
+        started = time.perf_counter()
+        deadline = started + self.budget
+        self.refresh_pids()
+
+        visited = set()
+        for _, pid, _ in self.cpu_top:
+            entry = self.entries.get(pid)
+            if entry is not None:
+                self.visit(entry)
+                visited.add(pid)
+
+        # Sweep the rest round-robin until the budget is used up or everyone was seen
+        for _ in range(len(self.queue)):
+            if time.perf_counter() >= deadline:
+                break
+            entry = self.queue.popleft()
+            if self.entries.get(entry.pid) is not entry:
+                continue  # exited (or the pid was reused), drop it from the rotation
+            self.queue.append(entry)
+            if entry.pid in visited or entry.denied:
+                continue
+            self.visit(entry)
+            visited.add(entry.pid)
+
+        live = [e for e in self.entries.values() if e.sampled_at is not None]
+        self.cpu_top = [
+            (e.name, e.pid, e.cpu_percent)
+            for e in heapq.nlargest(self.top_n, (e for e in live if e.cpu_percent),
+                                    key=lambda e: e.cpu_percent)
+        ]
+        self.rss_top = [
+            (e.name, e.pid, e.rss)
+            for e in heapq.nlargest(self.top_n, live, key=lambda e: e.rss)
+        ]
+
+        self.last_visited = len(visited)
+        self.last_cost = time.perf_counter() - started
+        return self.cpu_top, self.rss_top
+
+
+def format_bytes(value):
+    for unit in ('B', 'K', 'M', 'G'):
+        if value < 1024 or unit == 'G':
+            return f"{value:.0f}{unit}" if unit in ('B', 'K') else f"{value:.1f}{unit}"
+        value /= 1024
+
+
+def format_top(cpu_top, rss_top):
+    cpu = "  ".join(f"{name} {percent:.0f}%" for name, _, percent in cpu_top)
+    rss = "  ".join(f"{name} {format_bytes(rss)}" for name, _, rss in rss_top)
+    return f"CPU: {cpu or '-'}\nRAM: {rss or '-'}"
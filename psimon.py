@@ -0,0 +1,117 @@
+import os
+import select
+import threading
+import time
+
+# Stall time in any 2 s window that wakes the sampler early. 2 s windows are
+# the smallest unprivileged processes may use (Linux 6.5+); root can go lower.
+TRIGGER_STALL_US = 150_000
+TRIGGER_WINDOW_US = 2_000_000
+# Shortest window, in seconds, worth turning into a stall share; a few
+# milliseconds of counter movement reads as anything from 0 to 100%
+MIN_PSI_WINDOW = 0.1
+
+
+class PressureMonitor:
+    # Pressure stall information as one contention score: the share of the
+    # last sample window in which at least one task was stalled waiting on
+    # CPU, memory or I/O, whichever resource was worst. Computed from the
+    # cumulative `total=` counters rather than avg10 so it follows whatever
+    # cadence the sampler runs at.
+    def __init__(self, source, clock=time.monotonic):
+        self.source = source
+        self.clock = clock
+        self.prev = source.pressure()
+        self.available = self.prev is not None
+        self.prev_time = clock()
+        self.rates = {}  # resource -> (some %, full %)
+        self.percent = 0.0
+        self.cause = None
+
+    def sample(self, now=None):
+        if not self.available:
+            return 0.0
+        now = self.clock() if now is None else now
+        elapsed = now - self.prev_time
+        if elapsed < MIN_PSI_WINDOW:
+            return self.percent  # keep the counters; the window grows until the next call
+        current = self.source.pressure()
+        if current is None:
+            return self.percent
+
+        window = elapsed * 1_000_000
+        rates = {}
+        for resource, (some, full) in current.items():
+            previous = self.prev.get(resource)
+            if previous is None:
+                continue
+            rates[resource] = (
+                min(max(some - previous[0], 0) / window * 100, 100.0),
+                min(max(full - previous[1], 0) / window * 100, 100.0),
+            )
+
+        self.prev = current
+        self.prev_time = now
+        self.rates = rates
+        self.cause = max(rates, key=lambda resource: rates[resource][0], default=None)
+        self.percent = rates[self.cause][0] if self.cause else 0.0
+        return self.percent
+
+
+class PressureTrigger:
+    # Kernel-side PSI triggers: writing "some <stall> <window>" to a pressure
+    # file makes it raise POLLPRI as soon as that much stall time builds up
+    # inside the window. A daemon thread sits in poll() on them and calls
+    # `callback` with the resource, so a stall is noticed within milliseconds
+    # while the regular sampling interval stays relaxed.
+    def __init__(self, paths, callback, stall_us=TRIGGER_STALL_US, window_us=TRIGGER_WINDOW_US):
+        self.paths = dict(paths)
+        self.callback = callback
+        self.trigger = f"some {stall_us} {window_us}".encode() + b'\0'
+        self.fds = {}
+        self.wakeup = None
+        self.thread = None
+
+    def start(self):
+        # False when no trigger could be armed (old kernel, no permission, PSI off)
+        for resource, path in self.paths.items():
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+            except OSError:
+                continue
+            try:
+                os.write(fd, self.trigger)
+            except OSError:
+                os.close(fd)
+                continue
+            self.fds[fd] = resource
+        if not self.fds:
+            return False
+
+        self.wakeup = os.pipe()
+        poller = select.poll()
+        for fd in self.fds:
+            poller.register(fd, select.POLLPRI)
+        poller.register(self.wakeup[0], select.POLLIN)
+        self.thread = threading.Thread(target=self.watch, args=(poller,), daemon=True)
+        self.thread.start()
+        return True
+
+    def watch(self, poller):
+        while True:
+            for fd, event in poller.poll():
+                if fd == self.wakeup[0]:
+                    return
+                if event & select.POLLERR:
+                    poller.unregister(fd)  # the cgroup went away
+                elif event & select.POLLPRI:
+                    self.callback(self.fds[fd])
+
+    def close(self):
+        if self.thread is not None:
+            os.write(self.wakeup[1], b'x')
+            self.thread.join()
+            self.thread = None
+            for fd in (*self.fds, *self.wakeup):
+                os.close(fd)
+        self.fds = {}
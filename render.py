@@ -0,0 +1,40 @@
+# Sentinel for "never drawn", so the first set() of any value is always applied
+UNDRAWN = object()
+
+
+class Renderer:
+    # A view model of what is on screen. Each widget property is registered
+    # once under a key with the function that applies it; during a tick the
+    # UI stages the values it wants with set(), and flush() applies only the
+    # ones that differ from what was last drawn, in one pass. A tick whose
+    # values didn't change makes no Tk calls at all.
+    def __init__(self):
+        self.appliers = {}
+        self.drawn = {}
+        self.dirty = {}
+
+    def bind(self, key, apply):
+        self.appliers[key] = apply
+
+    def set(self, key, value):
+        if self.drawn.get(key, UNDRAWN) != value:
+            self.dirty[key] = value
+        else:
+            self.dirty.pop(key, None)
+
+    def forget(self, key):
+        # Something else drew over this property; apply the next value whatever it is
+        self.drawn.pop(key, None)
+
+    def flush(self):
+        dirty = self.dirty
+        if not dirty:
+            return 0
+        appliers = self.appliers
+        drawn = self.drawn
+        for key, value in dirty.items():
+            appliers[key](value)
+            drawn[key] = value
+        count = len(dirty)
+        self.dirty = {}
+        return count
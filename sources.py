@@ -0,0 +1,766 @@
+import glob
+import os
+import sys
+import time
+from collections import namedtuple
+
+# Imported on first use: psutil costs ~15 ms, which the widget would rather
+# pay after its window is on screen
+psutil = None
+
+# Raw counter shapes every source returns. Field names match psutil's so the
+# monitors don't care which backend produced them.
+CpuTimes = namedtuple('CpuTimes', 'user nice system idle iowait irq softirq steal')
+NetIO = namedtuple('NetIO', 'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout')
+DiskIO = namedtuple('DiskIO', 'read_count write_count read_bytes write_bytes read_time write_time busy_time')
+# °C like psutil's shwtemp; high/critical are None when the sensor doesn't say
+Temperature = namedtuple('Temperature', 'label current high critical')
+# temperatures: [Temperature], fans: [(label, rpm)], frequencies: [(current, max)]
+# in MHz per cpufreq policy, throttle_count: kernel thermal throttle events or None
+Sensors = namedtuple('Sensors', 'temperatures fans frequencies throttle_count')
+
+SECTOR_SIZE = 512
+
+# Pressure stall information, Linux 4.20+ (some distros need psi=1 on the command line)
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+PRESSURE_ROOT = '/proc/pressure'
+
+# Hardware sensors on Linux, indexed once by SensorIndex
+HWMON_ROOT = '/sys/class/hwmon'
+CPU_ROOT = '/sys/devices/system/cpu'
+CPUFREQ_ROOT = '/sys/devices/system/cpu/cpufreq'
+# Inputs kept per kind, so a server with dozens of hwmon chips still reads a
+# small fixed set per tick
+MAX_TEMP_INPUTS = 24
+MAX_FAN_INPUTS = 8
+MAX_FREQ_POLICIES = 32
+# Chips that measure the CPU itself; indexed ahead of disks, NICs and boards
+CPU_CHIPS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'soc_thermal', 'x86_pkg_temp', 'acpitz')
+
+
+def load_psutil():
+    global psutil
+    if psutil is None:
+        import psutil as module
+        psutil = module
+    return psutil
+
+
+def parse_pressure(data):
+    # PSI file contents -> (some, full) cumulative stall time in microseconds
+    some = full = 0
+    for line in data.split(b'\n'):
+        if line.startswith(b'some'):
+            some = int(line.rpartition(b'total=')[2])
+        elif line.startswith(b'full'):
+            full = int(line.rpartition(b'total=')[2])
+    return some, full
+
+
+class MetricSource:
+    # Where the collector's raw counters come from. Monitors ask the source
+    # for counters and do all the delta/rate maths themselves.
+    name = 'base'
+    # cpu_times() counts from boot, so the first read is a fair first guess at utilisation
+    counters_since_boot = True
+
+    def cpu_times(self):
+        # Per-core list of CpuTimes-like tuples, in seconds
+        raise NotImplementedError
+
+    def memory_percent(self):
+        raise NotImplementedError
+
+    def net_io(self):
+        # {nic: NetIO}
+        raise NotImplementedError
+
+    def disk_io(self):
+        # {device: DiskIO}
+        raise NotImplementedError
+
+    def battery(self):
+        # (percent, plugged) or None when there's no battery
+        raise NotImplementedError
+
+    def pressure_files(self):
+        # {resource: path} of the PSI files this source reads, also used for poll() triggers
+        paths = {resource: os.path.join(PRESSURE_ROOT, resource) for resource in PRESSURE_RESOURCES}
+        return {resource: path for resource, path in paths.items() if os.path.exists(path)}
+
+    sensor_index = None
+
+    def sensors(self):
+        # Sensors snapshot; the sensor list is discovered on the first call only
+        if self.sensor_index is None:
+            self.sensor_index = SensorIndex() if sys.platform.startswith('linux') else PsutilSensors()
+        return self.sensor_index.read()
+
+    def pressure(self):
+        # {resource: (some, full)} stall totals in microseconds, or None without PSI
+        counters = {}
+        for resource, path in self.pressure_files().items():
+            try:
+                with open(path, 'rb') as f:
+                    counters[resource] = parse_pressure(f.read())
+            except OSError:
+                continue  # PSI compiled in but switched off: the files exist and refuse reads
+        return counters or None
+
+    def close(self):
+        if self.sensor_index is not None:
+            self.sensor_index.close()
+            self.sensor_index = None
+
+
+class PsutilSource(MetricSource):
+    # Portable default: plain psutil calls, works everywhere psutil does
+    name = 'psutil'
+
+    def __init__(self):
+        load_psutil()
+
+    def cpu_times(self):
+        return psutil.cpu_times(percpu=True)
+
+    def memory_percent(self):
+        return psutil.virtual_memory().percent
+
+    def net_io(self):
+        return psutil.net_io_counters(pernic=True)
+
+    def disk_io(self):
+        return psutil.disk_io_counters(perdisk=True) or {}
+
+    def battery(self):
+        battery = psutil.sensors_battery()
+        if battery is None:
+            return None
+        return battery.percent, battery.power_plugged
+
+
+class ProcFile:
+    # A /proc or /sys file kept open for the life of the collector and
+    # re-read with pread() into one reusable buffer, so a sample is a single
+    # syscall with no open/close. read() hands back a view of that buffer;
+    # callers copy it out once with tobytes() to parse it, since the buffer
+    # also holds stale bytes past the end of the read.
+    def __init__(self, path, size=4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buffer = bytearray(size)
+
+    def read(self):
+        while True:
+            length = os.preadv(self.fd, [self.buffer], 0)
+            if length < len(self.buffer):
+                return memoryview(self.buffer)[:length]
+            # Didn't fit (lots of cores or NICs): grow once and keep the bigger buffer
+            self.buffer = bytearray(len(self.buffer) * 2)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class ProcfsSource(MetricSource):
+    # Linux fast path. Keeps /proc/stat, /proc/meminfo, /proc/net/dev,
+    # /proc/diskstats and the power_supply attributes open and parses only
+    # the fields the monitors use.
+    name = 'procfs'
+
+    def __init__(self, power_supply='/sys/class/power_supply'):
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.cpu_lines = -1  # learnt on the first read
+        self.stat = ProcFile('/proc/stat', 16384)
+        self.meminfo = ProcFile('/proc/meminfo')
+        self.netdev = ProcFile('/proc/net/dev')
+        self.diskstats = ProcFile('/proc/diskstats', 16384)
+        self.pressure_handles = self.open_pressure_files()
+        self.battery_files = None
+        self.ac_files = []
+        self.discover_power_supply(power_supply)
+
+    def discover_power_supply(self, root):
+        for path in sorted(glob.glob(os.path.join(root, '*'))):
+            try:
+                with open(os.path.join(path, 'type')) as f:
+                    kind = f.read().strip()
+                if kind == 'Battery' and self.battery_files is None:
+                    self.battery_files = (
+                        ProcFile(os.path.join(path, 'capacity'), 64),
+                        ProcFile(os.path.join(path, 'status'), 64),
+                    )
+                elif kind == 'Mains':
+                    self.ac_files.append(ProcFile(os.path.join(path, 'online'), 64))
+            except OSError:
+                continue
+
+    def cpu_times(self):
+        ticks = self.ticks
+        cores = []
+        # Only split off the cpu lines; the interrupt counters after them are huge
+        for line in self.stat.read().tobytes().split(b'\n', self.cpu_lines):
+            if not line.startswith(b'cpu'):
+                break  # per-cpu lines come first, nothing after them is needed
+            if line[3:4] == b' ':
+                continue  # aggregate "cpu" line
+            fields = line.split()
+            cores.append(CpuTimes(*(int(value) / ticks for value in fields[1:9])))
+        self.cpu_lines = len(cores) + 2
+        return cores
+
+    def memory_percent(self):
+        total = available = None
+        for line in self.meminfo.read().tobytes().split(b'\n'):
+            if line.startswith(b'MemTotal:'):
+                total = int(line.split()[1])
+            elif line.startswith(b'MemAvailable:'):
+                available = int(line.split()[1])
+                break  # MemAvailable comes right after MemTotal/MemFree
+        if not total or available is None:
+            return load_psutil().virtual_memory().percent
+        return round((total - available) / total * 100, 1)
+
+    def net_io(self):
+        counters = {}
+        for line in self.netdev.read().tobytes().split(b'\n')[2:]:
+            name, sep, rest = line.partition(b':')
+            if not sep:
+                continue
+            fields = rest.split()
+            counters[name.strip().decode()] = NetIO(
+                int(fields[8]), int(fields[0]),    # bytes sent / received
+                int(fields[9]), int(fields[1]),    # packets
+                int(fields[2]), int(fields[10]),   # errors in / out
+                int(fields[3]), int(fields[11]),   # drops in / out
+            )
+        return counters
+
+    def disk_io(self):
+        counters = {}
+        for line in self.diskstats.read().tobytes().split(b'\n'):
+            fields = line.split()
+            if len(fields) < 14:
+                continue
+            counters[fields[2].decode()] = DiskIO(
+                int(fields[3]), int(fields[7]),
+                int(fields[5]) * SECTOR_SIZE, int(fields[9]) * SECTOR_SIZE,
+                int(fields[6]), int(fields[10]),
+                int(fields[12]),
+            )
+        return counters
+
+    def battery(self):
+        if self.battery_files is None:
+            return None
+        capacity, status = self.battery_files
+        percent = float(capacity.read().tobytes())
+        state = status.read().tobytes().strip()
+        if self.ac_files:
+            plugged = any(f.read().tobytes().strip() == b'1' for f in self.ac_files)
+        else:
+            plugged = state in (b'Charging', b'Full')
+        return percent, plugged
+
+    def open_pressure_files(self):
+        handles = {}
+        for resource, path in self.pressure_files().items():
+            try:
+                handle = ProcFile(path, 256)
+            except OSError:
+                continue
+            try:
+                handle.read()
+            except OSError:
+                handle.close()  # PSI compiled in but switched off
+                continue
+            handles[resource] = handle
+        return handles
+
+    def pressure(self):
+        if not self.pressure_handles:
+            return None
+        return {resource: parse_pressure(f.read().tobytes()) for resource, f in self.pressure_handles.items()}
+
+    def close(self):
+        files = [self.stat, self.meminfo, self.netdev, self.diskstats] + self.ac_files
+        files.extend(self.pressure_handles.values())
+        if self.battery_files is not None:
+            files.extend(self.battery_files)
+        for f in files:
+            f.close()
+        super().close()
+
+
+def find_cgroup(cgroup_file='/proc/self/cgroup', mountinfo_file='/proc/self/mountinfo'):
+    # Directory of this process's cgroup v2, or None on v1-only hosts. Works
+    # both with a private cgroup namespace (the container sees its cgroup as
+    # "/") and without one (the full path is visible under the mount).
+    try:
+        with open(cgroup_file) as f:
+            path = next((line[3:].strip() for line in f if line.startswith('0::')), None)
+        with open(mountinfo_file) as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+    if path is None:
+        return None
+    for fields in mounts:
+        separator = fields.index('-')
+        if fields[separator + 1] != 'cgroup2':
+            continue
+        mountpoint = fields[4]
+        candidate = os.path.join(mountpoint, path.lstrip('/'))
+        for directory in (candidate, mountpoint):
+            if os.path.exists(os.path.join(directory, 'cpu.stat')):
+                return directory
+    return None
+
+
+def cgroup_limited(directory):
+    # True when the cgroup has a CPU or memory limit worth measuring against
+    for name in ('cpu.max', 'memory.max'):
+        try:
+            with open(os.path.join(directory, name)) as f:
+                if not f.read().startswith('max'):
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def parse_keyed(data):
+    # "key value" lines (cpu.stat, memory.stat, memory.events) -> {key: int}
+    values = {}
+    for line in data.split(b'\n'):
+        key, _, value = line.partition(b' ')
+        if value:
+            values[key] = int(value)
+    return values
+
+
+class CgroupFile(ProcFile):
+    # Interface files that only exist with the right controller enabled, or
+    # outside the root cgroup, are simply missing; read() then returns None
+    def __init__(self, directory, name, size=4096):
+        try:
+            super().__init__(os.path.join(directory, name), size)
+        except OSError:
+            self.fd = None
+
+    def read(self):
+        if self.fd is None:
+            return None
+        return super().read().tobytes()
+
+
+class CgroupSource(MetricSource):
+    # Container-aware accounting on cgroup v2. CPU is usage against the
+    # cpu.max quota (or the allowed CPUs), RAM is the working set against
+    # memory.max, and disk I/O is the cgroup's own io.stat, scored against
+    # io.max where one is set. The interface files stay open and are re-read
+    # with pread() like the procfs source, which also still supplies network
+    # and battery and the host-side device busy time.
+    name = 'cgroup'
+    # The pseudo-core's idle time starts at zero, so its first read always looks 100% busy
+    counters_since_boot = False
+
+    def __init__(self, directory=None, host=None):
+        self.directory = directory or find_cgroup()
+        if self.directory is None:
+            raise OSError("no cgroup v2 hierarchy found")
+        self.host = host or ProcfsSource()
+        self.cpu_stat = CgroupFile(self.directory, 'cpu.stat')
+        self.cpu_max = CgroupFile(self.directory, 'cpu.max', 256)
+        self.memory_current = CgroupFile(self.directory, 'memory.current', 256)
+        self.memory_max = CgroupFile(self.directory, 'memory.max', 256)
+        self.memory_stat = CgroupFile(self.directory, 'memory.stat', 8192)
+        self.memory_events = CgroupFile(self.directory, 'memory.events', 512)
+        self.io_stat = CgroupFile(self.directory, 'io.stat')
+        self.io_max = CgroupFile(self.directory, 'io.max')
+        self.pressure_handles = {
+            resource: CgroupFile(self.directory, f'{resource}.pressure', 256) for resource in PRESSURE_RESOURCES
+        }
+        self.host_memory = load_psutil().virtual_memory().total
+        self.device_names = {}  # "8:0" -> "sda", looked up once per device
+
+        stat = parse_keyed(self.cpu_stat.read() or b'')
+        self.prev_wall = time.monotonic()
+        self.capacity = stat.get(b'usage_usec', 0) / 1e6  # CPU-seconds allowed so far
+        self.prev_periods = stat.get(b'nr_periods', 0)
+        self.prev_throttled = stat.get(b'nr_throttled', 0)
+        self.throttled_percent = 0.0  # share of recent CFS periods that hit the quota
+        events = parse_keyed(self.memory_events.read() or b'')
+        self.oom_kills = events.get(b'oom_kill', 0)
+        self.io_prev = {}
+        self.io_busy = {}  # synthetic busy_time in ms for devices with an io.max limit
+
+    def cpu_limit(self):
+        data = self.cpu_max.read()
+        if data:
+            quota, _, period = data.partition(b' ')
+            if quota != b'max':
+                return int(quota) / int(period)
+        return len(os.sched_getaffinity(0))
+
+    def cpu_times(self):
+        # One pseudo-core whose idle time is whatever the limit allowed but
+        # wasn't used, so CpuSampler's busy fraction is usage / limit
+        stat = parse_keyed(self.cpu_stat.read() or b'')
+        now = time.monotonic()
+        self.capacity += (now - self.prev_wall) * self.cpu_limit()
+        self.prev_wall = now
+
+        periods = stat.get(b'nr_periods', 0) - self.prev_periods
+        if periods > 0:
+            throttled = stat.get(b'nr_throttled', 0) - self.prev_throttled
+            self.throttled_percent = round(throttled / periods * 100, 1)
+            self.prev_periods += periods
+            self.prev_throttled += throttled
+
+        user = stat.get(b'user_usec', 0) / 1e6
+        system = stat.get(b'system_usec', 0) / 1e6
+        idle = self.capacity - user - system
+        return [CpuTimes(user, 0.0, system, idle, 0.0, 0.0, 0.0, 0.0)]
+
+    def memory_percent(self):
+        current = self.memory_current.read()
+        if current is None:
+            return self.host.memory_percent()  # root cgroup: no per-cgroup accounting
+        limit = self.memory_max.read()
+        limit = self.host_memory if not limit or limit.startswith(b'max') else min(int(limit), self.host_memory)
+
+        events = self.memory_events.read()
+        if events is not None:
+            oom_kills = parse_keyed(events).get(b'oom_kill', 0)
+            if oom_kills > self.oom_kills:
+                self.oom_kills = oom_kills
+                return 100.0  # something just got killed for hitting the limit
+        # Working set, like the kubelet: page cache that could be dropped doesn't count
+        inactive_file = 0
+        stat = self.memory_stat.read()
+        if stat is not None:
+            inactive_file = parse_keyed(stat).get(b'inactive_file', 0)
+        working_set = max(int(current) - inactive_file, 0)
+        return round(min(working_set / limit * 100, 100.0), 1)
+
+    def device_name(self, device):
+        name = self.device_names.get(device)
+        if name is None:
+            name = ''
+            try:
+                with open(f'/sys/dev/block/{device}/uevent') as f:
+                    for line in f:
+                        if line.startswith('DEVNAME='):
+                            name = line[8:].strip()
+            except OSError:
+                pass
+            self.device_names[device] = name
+        return name
+
+    def io_limits(self):
+        # {"8:0": (rbps, wbps, riops, wiops)} with None for unlimited
+        limits = {}
+        for line in (self.io_max.read() or b'').split(b'\n'):
+            fields = line.split()
+            if not fields:
+                continue
+            values = dict(field.split(b'=') for field in fields[1:])
+            limits[fields[0].decode()] = tuple(
+                None if values.get(key, b'max') == b'max' else int(values[key])
+                for key in (b'rbps', b'wbps', b'riops', b'wiops')
+            )
+        return limits
+
+    def disk_io(self):
+        host = self.host.disk_io()
+        data = self.io_stat.read()
+        if data is None:
+            return host
+        limits = self.io_limits()
+        counters = {}
+        for line in data.split(b'\n'):
+            fields = line.split()
+            if not fields:
+                continue
+            device = fields[0].decode()
+            name = self.device_name(device)
+            if not name:
+                continue
+            values = dict(field.split(b'=') for field in fields[1:])
+            rbytes, wbytes = int(values.get(b'rbytes', 0)), int(values.get(b'wbytes', 0))
+            rios, wios = int(values.get(b'rios', 0)), int(values.get(b'wios', 0))
+
+            limit = limits.get(device)
+            if limit is not None and any(limit):
+                # Time-equivalent of the budget used: 1 s of a 10 MB/s cap is 10 MB
+                previous = self.io_prev.get(device, (rbytes, wbytes, rios, wios))
+                used = max(
+                    (current - before) / cap
+                    for current, before, cap in zip((rbytes, wbytes, rios, wios), previous, limit) if cap
+                )
+                self.io_busy[device] = self.io_busy.get(device, 0) + int(used * 1000)
+                busy_time = self.io_busy[device]
+            else:
+                # No throttle configured: the device itself is the limit
+                shared = host.get(name)
+                busy_time = shared.busy_time if shared is not None else 0
+            self.io_prev[device] = (rbytes, wbytes, rios, wios)
+            counters[name] = DiskIO(rios, wios, rbytes, wbytes, 0, 0, busy_time)
+        return counters
+
+    def net_io(self):
+        # /proc/net/dev is already per network namespace
+        return self.host.net_io()
+
+    def pressure_files(self):
+        # The cgroup's own stalls; the root cgroup has no *.pressure files, use the host's
+        paths = {resource: f.path for resource, f in self.pressure_handles.items() if f.fd is not None}
+        return paths or self.host.pressure_files()
+
+    def pressure(self):
+        counters = {}
+        for resource, f in self.pressure_handles.items():
+            try:
+                data = f.read()
+            except OSError:
+                continue
+            if data:
+                counters[resource] = parse_pressure(data)
+        return counters or self.host.pressure()
+
+    def battery(self):
+        return self.host.battery()
+
+    def sensors(self):
+        # Temperatures and clocks belong to the machine, not the cgroup
+        return self.host.sensors()
+
+    def close(self):
+        for f in (self.cpu_stat, self.cpu_max, self.memory_current, self.memory_max, self.memory_stat,
+                  self.memory_events, self.io_stat, self.io_max, *self.pressure_handles.values()):
+            f.close()
+        self.host.close()
+
+
+def read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def read_int(path):
+    text = read_text(path)
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_limit(path):
+    # hwmon millidegrees -> °C; plenty of chips report 0 for "no limit"
+    value = read_int(path)
+    return value / 1000 if value else None
+
+
+def input_number(path):
+    # temp10_input sorts after temp9_input
+    return trailing_number(path[:-len('_input')])
+
+
+def open_sensor(path):
+    try:
+        return ProcFile(path, 64)
+    except OSError:
+        return None
+
+
+def sensor_value(handle):
+    try:
+        return int(handle.read().tobytes())
+    except (OSError, ValueError):
+        return None  # some sensors refuse reads (ENODATA) while their device sleeps
+
+
+def trailing_number(path):
+    # policy12 -> 12, so cpu10 sorts after cpu9
+    name = os.path.basename(path)
+    digits = name[len(name.rstrip('0123456789')):]
+    return int(digits) if digits else 0
+
+
+class SensorIndex:
+    # Every sensor file worth reading, found once: hwmon temperature and fan
+    # inputs, cpufreq policies and the kernel's package throttle counters.
+    # Labels, limits and maximum clocks don't change, so they are read here;
+    # a tick is then one pread per indexed input, with each kind capped.
+    def __init__(self, hwmon_root=HWMON_ROOT, cpufreq_root=CPUFREQ_ROOT, cpu_root=CPU_ROOT):
+        self.temperatures = []  # (label, handle, high, critical)
+        self.fans = []  # (label, handle)
+        self.frequencies = []  # (handle, max MHz)
+        self.throttle = []  # one package_throttle_count per physical package
+        self.discover_hwmon(hwmon_root)
+        self.discover_cpufreq(cpufreq_root)
+        self.discover_throttle(cpu_root)
+
+    def discover_hwmon(self, root):
+        chips = []
+        for chip in glob.glob(os.path.join(root, 'hwmon*')):
+            name = read_text(os.path.join(chip, 'name')) or os.path.basename(chip)
+            chips.append((name not in CPU_CHIPS, trailing_number(chip), name, chip))
+        chips.sort()
+        for _, _, name, chip in chips:
+            for path in sorted(glob.glob(os.path.join(chip, 'temp*_input')), key=input_number):
+                if len(self.temperatures) >= MAX_TEMP_INPUTS:
+                    break
+                handle = open_sensor(path)
+                if handle is None:
+                    continue
+                prefix = path[:-len('_input')]
+                label = read_text(prefix + '_label') or os.path.basename(prefix)
+                self.temperatures.append(
+                    (f"{name}/{label}", handle, read_limit(prefix + '_max'), read_limit(prefix + '_crit'))
+                )
+            for path in sorted(glob.glob(os.path.join(chip, 'fan*_input')), key=input_number):
+                if len(self.fans) >= MAX_FAN_INPUTS:
+                    break
+                handle = open_sensor(path)
+                if handle is None:
+                    continue
+                prefix = path[:-len('_input')]
+                label = read_text(prefix + '_label') or os.path.basename(prefix)
+                self.fans.append((f"{name}/{label}", handle))
+
+    def discover_cpufreq(self, root):
+        policies = sorted(glob.glob(os.path.join(root, 'policy*')), key=trailing_number)
+        # Evenly spread subset on big boxes; x86 usually has one policy per core
+        step = max(1, -(-len(policies) // MAX_FREQ_POLICIES))
+        for policy in policies[::step]:
+            max_khz = read_int(os.path.join(policy, 'cpuinfo_max_freq'))
+            if not max_khz:
+                continue
+            handle = open_sensor(os.path.join(policy, 'scaling_cur_freq'))
+            if handle is not None:
+                self.frequencies.append((handle, max_khz / 1000))
+
+    def discover_throttle(self, root):
+        # Intel only; if cpu0 hasn't got the counters, nobody has
+        packages = set()
+        for cpu in sorted(glob.glob(os.path.join(root, 'cpu[0-9]*')), key=trailing_number):
+            package = read_text(os.path.join(cpu, 'topology', 'physical_package_id'))
+            if package in packages:
+                continue
+            handle = open_sensor(os.path.join(cpu, 'thermal_throttle', 'package_throttle_count'))
+            if handle is None:
+                break
+            packages.add(package)
+            self.throttle.append(handle)
+
+    def read(self):
+        temperatures = []
+        for label, handle, high, critical in self.temperatures:
+            value = sensor_value(handle)
+            if value is not None:
+                temperatures.append(Temperature(label, value / 1000, high, critical))
+        fans = []
+        for label, handle in self.fans:
+            value = sensor_value(handle)
+            if value is not None:
+                fans.append((label, value))
+        frequencies = []
+        for handle, max_mhz in self.frequencies:
+            value = sensor_value(handle)
+            if value is not None:
+                frequencies.append((value / 1000, max_mhz))
+        throttle_count = None
+        if self.throttle:
+            throttle_count = sum(sensor_value(handle) or 0 for handle in self.throttle)
+        return Sensors(temperatures, fans, frequencies, throttle_count)
+
+    def close(self):
+        handles = [entry[1] for entry in self.temperatures] + [entry[1] for entry in self.fans]
+        handles += [entry[0] for entry in self.frequencies] + self.throttle
+        for handle in handles:
+            handle.close()
+
+
+class PsutilSensors:
+    # Everywhere but Linux: whatever psutil can see, which re-enumerates on
+    # every call, so the sampler reads sensors on a slower cadence
+    def read(self):
+        psutil = load_psutil()
+        temperatures = []
+        if hasattr(psutil, 'sensors_temperatures'):
+            for chip, entries in psutil.sensors_temperatures().items():
+                for entry in entries[:MAX_TEMP_INPUTS]:
+                    temperatures.append(
+                        Temperature(f"{chip}/{entry.label or 'temp'}", entry.current, entry.high, entry.critical)
+                    )
+        fans = []
+        if hasattr(psutil, 'sensors_fans'):
+            for chip, entries in psutil.sensors_fans().items():
+                fans.extend((f"{chip}/{entry.label or 'fan'}", entry.current) for entry in entries)
+        frequencies = [(freq.current, freq.max) for freq in psutil.cpu_freq(percpu=True) or () if freq.max]
+        return Sensors(temperatures[:MAX_TEMP_INPUTS], fans[:MAX_FAN_INPUTS], frequencies[:MAX_FREQ_POLICIES], None)
+
+    def close(self):
+        pass
+
+
+SOURCES = {'psutil': PsutilSource, 'procfs': ProcfsSource, 'cgroup': CgroupSource}
+
+
+def create_source(name='psutil'):
+    # 'auto' measures against the container's limits when there are any,
+    # else picks the procfs fast path wherever /proc is available
+    if name == 'auto':
+        name = 'psutil'
+        if sys.platform.startswith('linux') and os.path.exists('/proc/stat'):
+            directory = find_cgroup()
+            name = 'cgroup' if directory and cgroup_limited(directory) else 'procfs'
+    return SOURCES[name]()
+
+
+def benchmark(source, rounds=2000):
+    # Mean cost of one full set of raw reads, in microseconds per call
+    calls = {
+        'cpu_times': source.cpu_times,
+        'memory_percent': source.memory_percent,
+        'net_io': source.net_io,
+        'disk_io': source.disk_io,
+        'battery': source.battery,
+        'pressure': source.pressure,
+        'sensors': source.sensors,
+    }
+    results = {}
+    for name, call in calls.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        results[name] = (time.perf_counter() - started) / rounds * 1e6
+    results['total'] = sum(results.values())
+    return results
+
+
+def main():
+    names = ['psutil']
+    if sys.platform.startswith('linux'):
+        names.append('procfs')
+        if find_cgroup():
+            names.append('cgroup')
+    print(f"{'probe':<16}" + ''.join(f"{name:>12}" for name in names) + "   (us per call)")
+    results = {}
+    for name in names:
+        source = create_source(name)
+        results[name] = benchmark(source)
+        source.close()
+    for probe in results[names[0]]:
+        print(f"{probe:<16}" + ''.join(f"{results[name][probe]:>12.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import math
+from bisect import bisect_right, insort
+
+from collector import STAT_FIELDS
+
+# EWMA time constant: a step change is ~63% through after this many seconds,
+# whatever the sampling cadence happens to be
+EWMA_TAU = 5.0
+# Quantile window, in samples; memory stays constant whatever it is set to
+QUANTILE_WINDOW = 600
+
+
+class Ewma:
+    # Exponentially weighted moving average over irregularly spaced samples.
+    # The weight of a new sample depends on how long it has been since the
+    # previous one, so a 250 ms cadence and a 15 s one smooth over the same time.
+    __slots__ = ('tau', 'value', 'timestamp')
+
+    def __init__(self, tau=EWMA_TAU):
+        self.tau = tau
+        self.value = None
+        self.timestamp = None
+
+    def update(self, value, timestamp):
+        if self.value is None or self.tau <= 0:
+            self.value = value
+        else:
+            elapsed = max(timestamp - self.timestamp, 0.0)
+            alpha = 1 - math.exp(-elapsed / self.tau)
+            self.value += alpha * (value - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+
+class P2Quantile:
+    # P-square estimator (Jain & Chlamtac, 1985): tracks one quantile of a
+    # stream with five markers nudged towards their ideal positions using
+    # piecewise-parabolic interpolation. O(1) time and memory per sample.
+    __slots__ = ('p', 'count', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        heights = self.heights
+        if self.count <= 5:
+            insort(heights, x)
+            return
+
+        positions = self.positions
+        if x < heights[0]:
+            heights[0] = x
+            cell = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            cell = 3
+        else:
+            cell = bisect_right(heights, x) - 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the three middle markers if they drifted a whole position off
+        for i in (1, 2, 3):
+            drift = self.desired[i] - positions[i]
+            if (drift >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (drift <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if drift > 0 else -1
+                height = self.parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def parabolic(self, i, step):
+        h = self.heights
+        n = self.positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            # Too few samples for markers yet: exact answer from what we have
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        return self.heights[2]
+
+
+class WindowedQuantile:
+    # Sliding-window flavour of P2Quantile: two estimators started half a
+    # window apart, answering from the older one. The reported quantile
+    # always covers the last window/2 to window samples, in constant memory.
+    __slots__ = ('p', 'window', 'older', 'newer')
+
+    def __init__(self, p, window=QUANTILE_WINDOW):
+        self.p = p
+        self.window = window
+        self.older = P2Quantile(p)
+        self.newer = P2Quantile(p)
+
+    def add(self, x):
+        self.older.add(x)
+        self.newer.add(x)
+        if self.newer.count >= self.window // 2:
+            self.older = self.newer
+            self.newer = P2Quantile(self.p)
+
+    def value(self):
+        return self.older.value()
+
+
+class MetricStats:
+    __slots__ = ('ewma', 'p95')
+
+    def __init__(self, tau=EWMA_TAU, window=QUANTILE_WINDOW):
+        self.ewma = Ewma(tau)
+        self.p95 = WindowedQuantile(0.95, window)
+
+    def update(self, value, timestamp):
+        self.p95.add(value)
+        return self.ewma.update(value, timestamp)
+
+
+class StreamingStats:
+    # Per-metric EWMA and sliding p95, updated once per sample. update()
+    # hands back the smoothed readings in STAT_FIELDS order.
+    def __init__(self, fields=STAT_FIELDS, tau=EWMA_TAU, window=QUANTILE_WINDOW):
+        self.fields = fields
+        self.tau = tau
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.metrics = {field: MetricStats(self.tau, self.window) for field in self.fields}
+
+    def update(self, timestamp, values):
+        return tuple(
+            self.metrics[field].update(value, timestamp) for field, value in zip(self.fields, values)
+        )
+
+    def ewma(self, field):
+        return self.metrics[field].ewma.value
+
+    def p95(self, field):
+        return self.metrics[field].p95.value()
@@ -0,0 +1,196 @@
+import os
+
+import pytest
+
+from sources import CgroupSource, CpuTimes, DiskIO, MetricSource, cgroup_limited, find_cgroup, parse_keyed, \
+    parse_pressure
+
+MOUNTINFO = (
+    "22 28 0:21 / /proc rw,nosuid,nodev,noexec,relatime shared:12 - proc proc rw\n"
+    "30 23 0:26 / {mount} rw,nosuid,nodev,noexec,relatime shared:4 - cgroup2 cgroup2 rw,nsdelegate\n"
+    "31 23 0:27 / /sys/fs/cgroup/unified rw shared:5 - tmpfs tmpfs rw\n"
+)
+GIB = 1024 ** 3
+
+
+class Host(MetricSource):
+    # Stands in for the procfs source the cgroup one falls back on
+    name = 'host'
+
+    def __init__(self):
+        self.disks = {}
+
+    def memory_percent(self):
+        return 12.5
+
+    def disk_io(self):
+        return self.disks
+
+    def pressure(self):
+        return {'cpu': (1, 0)}
+
+
+def write(directory, **files):
+    for name, text in files.items():
+        (directory / name.replace('_', '.', 1)).write_text(text)
+
+
+def cgroup_dir(tmp_path, **files):
+    directory = tmp_path / 'cg'
+    directory.mkdir()
+    write(directory, cpu_stat="usage_usec 0\nuser_usec 0\nsystem_usec 0\nnr_periods 0\nnr_throttled 0\n", **files)
+    return directory
+
+
+@pytest.fixture
+def sources():
+    opened = []
+
+    def make(directory, host=None):
+        source = CgroupSource(directory=str(directory), host=host or Host())
+        opened.append(source)
+        return source
+    yield make
+    for source in opened:
+        source.close()
+
+
+def fake_proc(tmp_path, cgroup, mount):
+    proc = tmp_path / 'proc'
+    proc.mkdir()
+    (proc / 'cgroup').write_text(cgroup)
+    (proc / 'mountinfo').write_text(MOUNTINFO.format(mount=mount))
+    return str(proc / 'cgroup'), str(proc / 'mountinfo')
+
+
+def test_find_cgroup_without_namespace(tmp_path):
+    mount = tmp_path / 'fs'
+    (mount / 'system.slice' / 'app.service').mkdir(parents=True)
+    (mount / 'system.slice' / 'app.service' / 'cpu.stat').write_text('')
+    (mount / 'cpu.stat').write_text('')
+    files = fake_proc(tmp_path, "0::/system.slice/app.service\n", mount)
+    assert find_cgroup(*files) == str(mount / 'system.slice' / 'app.service')
+
+
+def test_find_cgroup_inside_a_namespace(tmp_path):
+    # The container sees its own cgroup as "/", mounted at the usual place
+    mount = tmp_path / 'fs'
+    mount.mkdir()
+    (mount / 'cpu.stat').write_text('')
+    files = fake_proc(tmp_path, "0::/\n", mount)
+    assert find_cgroup(*files) == os.path.join(str(mount), '')
+
+
+def test_find_cgroup_on_a_v1_host(tmp_path):
+    files = fake_proc(tmp_path, "12:cpu,cpuacct:/user.slice\n1:name=systemd:/user.slice\n", tmp_path)
+    assert find_cgroup(*files) is None
+
+
+def test_find_cgroup_without_proc(tmp_path):
+    assert find_cgroup(str(tmp_path / 'missing'), str(tmp_path / 'missing')) is None
+
+
+@pytest.mark.parametrize('cpu_max, memory_max, limited', [
+    ("max 100000\n", "max\n", False),
+    ("50000 100000\n", "max\n", True),
+    ("max 100000\n", "536870912\n", True),
+    (None, None, False),
+])
+def test_cgroup_limited(tmp_path, cpu_max, memory_max, limited):
+    if cpu_max is not None:
+        (tmp_path / 'cpu.max').write_text(cpu_max)
+    if memory_max is not None:
+        (tmp_path / 'memory.max').write_text(memory_max)
+    assert cgroup_limited(str(tmp_path)) is limited
+
+
+def test_parse_keyed():
+    data = b"usage_usec 2500\nuser_usec 2000\nsystem_usec 500\n\n"
+    assert parse_keyed(data) == {b'usage_usec': 2500, b'user_usec': 2000, b'system_usec': 500}
+
+
+def test_parse_pressure():
+    data = (b"some avg10=1.50 avg60=0.80 avg300=0.10 total=123456\n"
+            b"full avg10=0.00 avg60=0.00 avg300=0.00 total=789\n")
+    assert parse_pressure(data) == (123456, 789)
+    assert parse_pressure(b"some avg10=0.00 avg60=0.00 avg300=0.00 total=5\n") == (5, 0)
+
+
+@pytest.mark.parametrize('cpu_max, expected', [
+    ("50000 100000\n", 0.5),
+    ("250000 100000\n", 2.5),
+    ("max 100000\n", None),
+])
+def test_cpu_limit(tmp_path, sources, cpu_max, expected):
+    source = sources(cgroup_dir(tmp_path, cpu_max=cpu_max))
+    assert source.cpu_limit() == (expected or len(os.sched_getaffinity(0)))
+
+
+def test_cpu_times_is_one_core_of_usage_against_the_limit(tmp_path, sources):
+    directory = cgroup_dir(tmp_path, cpu_max="100000 100000\n")
+    source = sources(directory)
+    write(directory, cpu_stat="usage_usec 300000\nuser_usec 200000\nsystem_usec 100000\n"
+                              "nr_periods 10\nnr_throttled 4\n")
+    (core,) = source.cpu_times()
+    assert isinstance(core, CpuTimes)
+    assert (core.user, core.system) == (0.2, 0.1)
+    assert source.throttled_percent == 40.0
+
+
+@pytest.mark.parametrize('memory_max, expected', [
+    ("1073741824\n", 50.0),
+    ("max\n", None),
+])
+def test_memory_is_working_set_against_the_limit(tmp_path, sources, memory_max, expected):
+    directory = cgroup_dir(
+        tmp_path,
+        memory_current=f"{GIB * 3 // 4}\n",
+        memory_max=memory_max,
+        memory_stat=f"anon {GIB // 2}\ninactive_file {GIB // 4}\nactive_file 0\n",
+        memory_events="low 0\nhigh 0\nmax 0\noom 0\noom_kill 0\n",
+    )
+    source = sources(directory)
+    if expected is None:
+        expected = round(min(GIB / 2 / source.host_memory * 100, 100.0), 1)
+    assert source.memory_percent() == expected
+
+
+def test_an_oom_kill_reads_as_full(tmp_path, sources):
+    directory = cgroup_dir(
+        tmp_path, memory_current=f"{GIB // 10}\n", memory_max=f"{GIB}\n",
+        memory_events="oom 0\noom_kill 0\n",
+    )
+    source = sources(directory)
+    assert source.memory_percent() == 10.0
+    write(directory, memory_events="oom 1\noom_kill 1\n")
+    assert source.memory_percent() == 100.0
+    assert source.memory_percent() == 10.0
+
+
+def test_root_cgroup_falls_back_to_the_host(tmp_path, sources):
+    source = sources(cgroup_dir(tmp_path))
+    assert source.memory_percent() == 12.5
+    assert source.pressure() == {'cpu': (1, 0)}
+
+
+def test_io_limits(tmp_path, sources):
+    source = sources(cgroup_dir(tmp_path, io_max="8:0 rbps=10485760 wbps=max riops=max wiops=100\n"))
+    assert source.io_limits() == {'8:0': (10485760, None, None, 100)}
+
+
+def test_disk_io_scores_against_io_max(tmp_path, sources):
+    directory = cgroup_dir(
+        tmp_path,
+        io_max="8:0 rbps=1000000 wbps=max riops=max wiops=max\n",
+        io_stat="8:0 rbytes=0 wbytes=0 rios=0 wios=0 dbytes=0 dios=0\n",
+    )
+    host = Host()
+    host.disks = {'sda': DiskIO(0, 0, 0, 0, 0, 0, 777)}
+    source = sources(directory, host)
+    source.device_names['8:0'] = 'sda'
+    source.disk_io()
+    write(directory, io_stat="8:0 rbytes=500000 wbytes=0 rios=10 wios=0 dbytes=0 dios=0\n")
+    counters = source.disk_io()
+    # Half a second's worth of the 1 MB/s budget
+    assert counters['sda'].busy_time == 500
+    assert counters['sda'].read_bytes == 500000
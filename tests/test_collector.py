@@ -0,0 +1,58 @@
+import pytest
+
+import bench
+from collector import HOT_HOLD, AdaptiveInterval, STAT_FIELDS
+
+
+def stats(**readings):
+    values = {'cpu': 10.0, 'ram': 30.0, 'disk': 40.0, 'network': 5.0, 'battery': 100.0, 'psi': 0.0,
+              'thermal': 40.0}
+    values.update(readings)
+    return tuple(values[field] for field in STAT_FIELDS)
+
+
+def test_calm_readings_sample_slowly():
+    pacer = AdaptiveInterval()
+    assert pacer.next_interval(stats()) == pacer.idle
+
+
+@pytest.mark.parametrize('readings', [
+    {'cpu': 55.0}, {'ram': 70.0}, {'disk': 82.0}, {'network': 65.0}, {'psi': 12.0}, {'thermal': 65.0},
+    {'battery': 10.0},
+])
+def test_leaving_the_calmest_band_samples_normally(readings):
+    pacer = AdaptiveInterval()
+    assert pacer.next_interval(stats(**readings)) == pacer.normal
+
+
+@pytest.mark.parametrize('field', ['cpu', 'ram', 'disk', 'network', 'psi', 'thermal'])
+def test_any_hot_metric_samples_fast(field):
+    pacer = AdaptiveInterval(hot_threshold=85.0)
+    assert pacer.next_interval(stats(**{field: 85.0})) == pacer.hot
+
+
+def test_a_jump_counts_as_hot():
+    pacer = AdaptiveInterval(jump=15.0)
+    pacer.next_interval(stats(cpu=10.0))
+    assert pacer.next_interval(stats(cpu=30.0)) == pacer.hot
+
+
+def test_stays_fast_for_the_hold_then_relaxes():
+    pacer = AdaptiveInterval()
+    assert pacer.next_interval(stats(cpu=95.0)) == pacer.hot
+    # The drop back down is itself a jump, so the hold restarts there
+    intervals = [pacer.next_interval(stats()) for _ in range(HOT_HOLD + 1)]
+    assert intervals[:HOT_HOLD] == [pacer.hot] * HOT_HOLD
+    assert intervals[HOT_HOLD] == pacer.idle
+
+
+def test_fixed_interval():
+    pacer = AdaptiveInterval(idle=2.0, normal=2.0, hot=2.0)
+    assert {pacer.next_interval(stats(cpu=cpu)) for cpu in (5.0, 60.0, 99.0, 5.0)} == {2.0}
+
+
+def test_synthetic_scenario_is_reproducible():
+    # Every rate window runs on the scenario's virtual clock, not wall time
+    first = [stats for _, stats in bench.synthetic_readings(30)]
+    second = [stats for _, stats in bench.synthetic_readings(30)]
+    assert first == second
@@ -0,0 +1,47 @@
+import pytest
+
+from diskmon import partition_of, whole_disks
+
+
+@pytest.mark.parametrize('name, disk, expected', [
+    ('sda1', 'sda', True),
+    ('sda15', 'sda', True),
+    ('sdaa', 'sda', False),
+    ('sdaa1', 'sda', False),
+    ('sdb1', 'sda', False),
+    ('vda2', 'vda', True),
+    ('xvda1', 'xvda', True),
+    ('nvme0n1p1', 'nvme0n1', True),
+    ('nvme0n1p12', 'nvme0n1', True),
+    ('nvme0n10', 'nvme0n1', False),
+    ('nvme0n11', 'nvme0n1', False),
+    ('nvme1n1p1', 'nvme0n1', False),
+    ('mmcblk0p1', 'mmcblk0', True),
+    ('mmcblk0boot0', 'mmcblk0', False),
+    ('mmcblk01', 'mmcblk0', False),
+    ('dm-10', 'dm-1', False),
+    ('dm-11', 'dm-1', False),
+    ('md12', 'md1', False),
+    ('md1p1', 'md1', True),
+    ('sda', 'sda', False),
+])
+def test_partition_of(name, disk, expected):
+    assert partition_of(name, disk) is expected
+
+
+@pytest.mark.parametrize('names, disks', [
+    (['sda', 'sda1', 'sda2', 'sdb', 'sdb1'], ['sda', 'sdb']),
+    (['sda', 'sdaa', 'sdaa1', 'sdab'], ['sda', 'sdaa', 'sdab']),
+    (['nvme0n1', 'nvme0n1p1', 'nvme0n1p2', 'nvme0n10', 'nvme0n10p1'], ['nvme0n1', 'nvme0n10']),
+    (['dm-0', 'dm-1', 'dm-10', 'dm-11', 'dm-2'], ['dm-0', 'dm-1', 'dm-10', 'dm-11', 'dm-2']),
+    (['md1', 'md12', 'md127'], ['md1', 'md12', 'md127']),
+    (['mmcblk0', 'mmcblk0p1', 'mmcblk0p2', 'mmcblk1'], ['mmcblk0', 'mmcblk1']),
+    # Partitions whose disk isn't listed can't be told apart by name and are kept
+    (['sda1', 'sda2'], ['sda1', 'sda2']),
+    # macOS and Windows names
+    (['disk0', 'disk1', 'disk4'], ['disk0', 'disk1', 'disk4']),
+    (['PhysicalDrive0', 'PhysicalDrive1'], ['PhysicalDrive0', 'PhysicalDrive1']),
+    ([], []),
+])
+def test_whole_disks(names, disks):
+    assert whole_disks(names) == disks
@@ -0,0 +1,74 @@
+import json
+
+import bench
+import fleet
+import pc
+
+
+def send(aggregator, host, timestamp, **readings):
+    record = {'ts': timestamp, 'host': host, 'cpu': 10, 'ram': 10, 'disk': 10, 'network': 1, 'battery': 100}
+    record.update(readings)
+    aggregator.ingest(json.dumps(record))
+
+
+def dashboard(aggregator, monkeypatch):
+    monkeypatch.setattr(pc, 'tk', bench.FAKE_TK)
+    return pc.FleetDashboard(aggregator, 'test')
+
+
+def test_ingest_defaults_fields_older_agents_lack():
+    aggregator = fleet.FleetAggregator()
+    send(aggregator, 'old', 1.0)
+    state = aggregator.hosts['old']
+    assert state.latest[-2:] == (0.0, 0.0)
+    assert (state.disk_cause, state.thermal_cause) == ('space', 'heat')
+
+
+def test_ingest_keeps_the_agents_causes():
+    aggregator = fleet.FleetAggregator()
+    send(aggregator, 'box', 1.0, disk=95, disk_cause='io', thermal=97, thermal_throttling=True)
+    state = aggregator.hosts['box']
+    assert (state.disk_cause, state.thermal_cause) == ('io', 'throttle')
+    send(aggregator, 'box', 2.0)
+    assert (state.disk_cause, state.thermal_cause) == ('space', 'heat')
+
+
+def test_dashboard_draws_each_sample_once(monkeypatch):
+    aggregator = fleet.FleetAggregator()
+    send(aggregator, 'a', 1.0)
+    view = dashboard(aggregator, monkeypatch)
+    drawn = []
+    monkeypatch.setattr(view, 'render_stats', lambda *values, timestamp=None: drawn.append(timestamp))
+    for _ in range(5):
+        view.refresh_fleet()
+    assert drawn == []
+    send(aggregator, 'a', 2.0)
+    view.refresh_fleet()
+    view.refresh_fleet()
+    assert drawn == [2.0]
+
+
+def test_dashboard_switches_host_only_past_the_margin(monkeypatch):
+    aggregator = fleet.FleetAggregator()
+    send(aggregator, 'a', 1.0, cpu=60)
+    send(aggregator, 'b', 1.0, cpu=40)
+    view = dashboard(aggregator, monkeypatch)
+    assert view.current.host == 'a'
+    send(aggregator, 'b', 2.0, cpu=63)
+    view.refresh_fleet()
+    assert view.current.host == 'a'
+    send(aggregator, 'b', 3.0, cpu=70)
+    view.refresh_fleet()
+    assert view.current.host == 'b'
+    # Each host has its own smoothing and mood state
+    assert view.host_moods['a'][0] is not view.host_moods['b'][0]
+
+
+def test_dashboard_mood_follows_agent_causes(monkeypatch):
+    aggregator = fleet.FleetAggregator()
+    send(aggregator, 'a', 0.0)
+    view = dashboard(aggregator, monkeypatch)
+    for second in range(1, 30):
+        send(aggregator, 'a', float(second), thermal=97, thermal_throttling=True)
+        view.refresh_fleet()
+    assert view.mood_engine.state[0] == 'throttled'
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from flightlog import HEADER, FlightLogReader, FlightLogWriter, parse_time, read_header, record_struct
+
+FIELDS = ('cpu', 'ram', 'disk')
+
+
+def write(path, samples, **options):
+    writer = FlightLogWriter(str(path), fields=FIELDS, **options)
+    for timestamp, values in samples:
+        writer.append(timestamp, values)
+    writer.close()
+
+
+def samples(count, start=1000.0):
+    return [(start + i, (float(i % 100), 50.0, 25.5)) for i in range(count)]
+
+
+def test_header_and_record_layout(tmp_path):
+    path = tmp_path / 'log.fl'
+    write(path, samples(3))
+    record_size, fields = read_header(str(path))
+    assert fields == FIELDS
+    assert record_size == 8 + 4 * len(FIELDS)
+    assert os.path.getsize(path) == HEADER.size + 3 * record_size
+    assert HEADER.size == 64
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'log.fl'
+    written = samples(10)
+    write(path, written)
+    with FlightLogReader(str(path)) as reader:
+        read = list(reader.read())
+    assert [timestamp for timestamp, _ in read] == [timestamp for timestamp, _ in written]
+    assert read[3][1] == pytest.approx(list(written[3][1]))
+
+
+def test_read_range_is_inclusive(tmp_path):
+    path = tmp_path / 'log.fl'
+    write(path, samples(100))
+    with FlightLogReader(str(path)) as reader:
+        read = [timestamp for timestamp, _ in reader.read(1010.0, 1019.5)]
+    assert read == [1010.0 + i for i in range(10)]
+
+
+def test_rotation_keeps_whole_records_and_all_samples(tmp_path):
+    path = tmp_path / 'log.fl'
+    record_size = record_struct(len(FIELDS)).size
+    max_bytes = HEADER.size + 10 * record_size + record_size // 2
+    write(path, samples(35), max_bytes=max_bytes, backups=4)
+
+    for candidate in (path, tmp_path / 'log.fl.1', tmp_path / 'log.fl.2', tmp_path / 'log.fl.3'):
+        size = os.path.getsize(candidate)
+        assert size <= max_bytes
+        assert (size - HEADER.size) % record_size == 0
+    with FlightLogReader(str(path)) as reader:
+        assert [timestamp for timestamp, _ in reader.read()] == [1000.0 + i for i in range(35)]
+        assert [count for _, _, _, count in reader.index()] == [10, 10, 10, 5]
+
+
+def test_rotation_drops_oldest_beyond_backups(tmp_path):
+    path = tmp_path / 'log.fl'
+    record_size = record_struct(len(FIELDS)).size
+    write(path, samples(50), max_bytes=HEADER.size + 10 * record_size, backups=2)
+    assert not os.path.exists(tmp_path / 'log.fl.3')
+    with FlightLogReader(str(path), backups=2) as reader:
+        read = [timestamp for timestamp, _ in reader.read()]
+    assert read == [1020.0 + i for i in range(30)]
+
+
+def test_reader_skips_files_outside_range(tmp_path):
+    path = tmp_path / 'log.fl'
+    record_size = record_struct(len(FIELDS)).size
+    write(path, samples(30), max_bytes=HEADER.size + 10 * record_size)
+    with FlightLogReader(str(path)) as reader:
+        assert [timestamp for timestamp, _ in reader.read(1015.0, 1016.0)] == [1015.0, 1016.0]
+
+
+def test_appending_reuses_a_compatible_file(tmp_path):
+    path = tmp_path / 'log.fl'
+    write(path, samples(3))
+    write(path, samples(2, start=2000.0))
+    assert not os.path.exists(tmp_path / 'log.fl.1')
+    with FlightLogReader(str(path)) as reader:
+        assert len(list(reader.read())) == 5
+
+
+def test_layout_change_rotates_old_file_away(tmp_path):
+    path = tmp_path / 'log.fl'
+    write(path, samples(3))
+    writer = FlightLogWriter(str(path), fields=('cpu', 'ram'))
+    writer.append(2000.0, (1.0, 2.0))
+    writer.close()
+    assert read_header(str(tmp_path / 'log.fl.1'))[1] == FIELDS
+    assert read_header(str(path))[1] == ('cpu', 'ram')
+
+
+def test_corrupt_header_is_rejected(tmp_path):
+    path = tmp_path / 'log.fl'
+    path.write_bytes(b'nope' + b'\0' * 60)
+    with pytest.raises(ValueError):
+        read_header(str(path))
+
+
+def test_parse_time():
+    now = 1_700_000_000.0
+    assert parse_time('-15m', now) == now - 900
+    assert parse_time('-2h', now) == now - 7200
+    assert parse_time('15m', now) == now - 900
+    assert parse_time('now-90s', now) == now - 90
+    assert parse_time('now', now) == now
+    assert parse_time('1234.5', now) == 1234.5
+    assert parse_time('2024-01-02T03:04:05') == parse_time('2024-01-02 03:04:05')
+
+
+def test_parse_time_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_time('soon')
+    with pytest.raises(ValueError):
+        parse_time('xm')
@@ -0,0 +1,119 @@
+from moods import ANIMATIONS, MOOD_DATA, MoodEngine, ThresholdLatch, ThresholdTable, severity
+
+
+def calm(**readings):
+    values = {'cpu': 10.0, 'ram': 10.0, 'disk': 10.0, 'network': 10.0, 'battery': 90.0}
+    values.update(readings)
+    return values
+
+
+def message(category, threshold):
+    return next(mood for mood in MOOD_DATA[category] if mood['threshold'] == threshold)
+
+
+def test_threshold_table_below_first_threshold_is_first_level():
+    table = ThresholdTable((30, 50, 70), 'abc')
+    assert table.level(0) == 0
+    assert table.level(49.9) == 0
+    assert table.level(50) == 1
+    assert table.level(100) == 2
+
+
+def test_threshold_table_hysteresis():
+    table = ThresholdTable((0, 80), (False, True), margin=5)
+    assert table.level(79.9, current=0) == 0
+    # Entered at the threshold, left only once more than `margin` below it
+    assert table.level(76, current=1) == 1
+    assert table.level(75, current=1) == 1
+    assert table.level(74.9, current=1) == 0
+    # Going up is never delayed
+    assert table.level(80, current=0) == 1
+
+
+def test_engine_shows_first_sample_straight_away():
+    engine = MoodEngine(dwell=2)
+    category, value, mood, animation = engine.update(**calm(cpu=97))
+    assert (category, value, mood, animation) == ('cpu', 97, message('cpu', 95), 'shake')
+
+
+def test_engine_ignores_a_single_spike():
+    engine = MoodEngine(dwell=2)
+    engine.update(**calm(cpu=20))
+    category, value, mood, animation = engine.update(**calm(cpu=97))
+    assert mood == message('cpu', 30)
+    assert animation is None
+    engine.update(**calm(cpu=20))
+    _, _, mood, _ = engine.update(**calm(cpu=97))
+    assert mood == message('cpu', 30)
+
+
+def test_engine_switches_after_dwell():
+    engine = MoodEngine(dwell=2)
+    engine.update(**calm(cpu=20))
+    engine.update(**calm(cpu=97))
+    _, _, mood, animation = engine.update(**calm(cpu=97))
+    assert mood == message('cpu', 95)
+    assert animation == 'shake'
+
+
+def test_engine_level_hysteresis():
+    engine = MoodEngine(dwell=1)
+    engine.update(**calm(cpu=86))
+    # Inside the band under the 85 threshold the level holds
+    assert engine.update(**calm(cpu=81))[2] == message('cpu', 85)
+    assert engine.update(**calm(cpu=79))[2] == message('cpu', 70)
+
+
+def test_engine_keeps_metric_until_beaten_by_margin():
+    engine = MoodEngine(dwell=1)
+    assert engine.update(**calm(cpu=60, ram=50))[0] == 'cpu'
+    assert engine.update(**calm(cpu=60, ram=64))[0] == 'cpu'
+    assert engine.update(**calm(cpu=60, ram=66))[0] == 'ram'
+
+
+def test_engine_alternating_readings_do_not_flap():
+    engine = MoodEngine(dwell=2)
+    shown = set()
+    for i in range(40):
+        shown.add(engine.update(**calm(cpu=84 if i % 2 else 96))[2]['message'])
+    assert len(shown) == 1
+
+
+def test_engine_causes_pick_their_own_categories():
+    engine = MoodEngine(dwell=1)
+    assert engine.update(**calm(disk=90), disk_cause='io')[0] == 'disk_io'
+    engine.reset()
+    assert engine.update(**calm(thermal=96), thermal_cause='throttle')[0] == 'throttled'
+    engine.reset()
+    assert engine.update(**calm(thermal=96))[0] == 'thermal'
+
+
+def test_engine_critical_battery_overrides():
+    engine = MoodEngine(dwell=1)
+    category, _, mood, animation = engine.update(**calm(cpu=97, battery=10))
+    assert category == 'battery'
+    assert mood == message('battery', 15)
+    assert animation == ANIMATIONS[-1]
+    # Stays critical until the charge is `margin` past the threshold
+    assert engine.update(**calm(battery=18))[0] == 'battery'
+    assert engine.update(**calm(battery=21))[0] == 'cpu'
+
+
+def test_latch_needs_dwell_both_ways():
+    latch = ThresholdLatch(90, margin=5, dwell=2)
+    assert latch.update(95) is False
+    assert latch.update(95) is True
+    assert latch.update(87) is True
+    assert latch.update(80) is True
+    assert latch.update(80) is False
+
+
+def test_latch_ignores_flapping():
+    latch = ThresholdLatch(90, margin=5, dwell=2)
+    assert not any(latch.update(84 if i % 2 else 96) for i in range(40))
+
+
+def test_severity_counts_critical_battery():
+    assert severity(10, 20, 30, 40, 90) == 40
+    assert severity(10, 20, 30, 40, 5) == 95
+    assert severity(10, 20, 30, 40, 90, psi=70, thermal=60) == 70
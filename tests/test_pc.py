@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import pc
+from flightlog import parse_time
+
+
+@pytest.mark.parametrize('argv, start, end', [
+    (['replay', 'x.fl'], None, None),
+    (['replay', 'x.fl', '15m'], '15m', None),
+    (['replay', 'x.fl', 'now-2h', 'now-1h'], 'now-2h', 'now-1h'),
+    (['replay', 'x.fl', '14:00', 'now', '--speed', '10'], '14:00', 'now'),
+])
+def test_replay_range_parses_from_the_command_line(argv, start, end):
+    args = pc.build_parser().parse_args(argv)
+    assert (args.log, args.start, args.end) == ('x.fl', start, end)
+    now = 1_700_000_000.0
+    for text in (args.start, args.end):
+        if text is not None:
+            assert parse_time(text, now) <= now
+
+
+def test_replay_relative_start_goes_back_from_now():
+    args = pc.build_parser().parse_args(['replay', 'x.fl', 'now-15m', 'now'])
+    assert parse_time(args.start, 1000.0) == 100.0
+    assert parse_time(args.end, 1000.0) == 1000.0
+
+
+def test_unknown_options_are_still_rejected():
+    with pytest.raises(SystemExit):
+        pc.main(['collect', '--no-such-option'])
+
+
+def test_launching_does_not_import_bench():
+    # A fresh interpreter: this test session may have imported bench already
+    script = "import sys, pc; pc.build_parser(); print('bench' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(pc.__file__),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_bench_options_are_left_for_bench():
+    args, extra = pc.build_parser().parse_known_args(['bench', '-n', '20', '--tk'])
+    assert args.command == 'bench'
+    assert extra == ['-n', '20', '--tk']
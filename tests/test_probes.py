@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from probes import Probe, ProbeCall, ProbeExecutor
+
+
+class Blocking:
+    # A probe body that hangs until released, counting how often it was started
+    def __init__(self, value=7.0):
+        self.value = value
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, now):
+        self.calls += 1
+        self.release.wait(5)
+        return self.value
+
+
+class Flaky:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def __call__(self, now):
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+@pytest.fixture
+def executors():
+    created = []
+
+    def make(probes):
+        executor = ProbeExecutor(probes)
+        created.append(executor)
+        return executor
+    yield make
+    for executor in created:
+        executor.close()
+
+
+def test_probe_call_result_times_out():
+    call = ProbeCall()
+    with pytest.raises(TimeoutError):
+        call.result(timeout=0.01)
+    call.value = 3
+    call.finished.set()
+    assert call.done() and call.result() == 3
+
+
+def test_slow_probe_misses_deadline_and_publishes_default(executors):
+    body = Blocking()
+    executor = executors([Probe('slow', body, deadline=0.05, default=-1.0)])
+    started = time.monotonic()
+    values = executor.run(0.0)
+    assert time.monotonic() - started < 1.0
+    assert values == {'slow': -1.0}
+    assert executor.stale == {'slow'}
+    body.release.set()
+
+
+def test_stuck_probe_is_not_started_again(executors):
+    body = Blocking()
+    executor = executors([Probe('slow', body, deadline=0.02)])
+    for tick in range(4):
+        executor.run(float(tick))
+        assert executor.stale == {'slow'}
+    assert body.calls == 1
+    body.release.set()
+
+
+def test_late_result_is_harvested_on_a_later_tick(executors):
+    body = Blocking(value=42.0)
+    probe = Probe('slow', body, deadline=0.02)
+    executor = executors([probe])
+    executor.run(0.0)
+    body.release.set()
+    # Give the worker a moment to finish the old call
+    deadline = time.monotonic() + 2
+    while not probe.pending.done() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    values = executor.run(1.0)
+    assert values['slow'] == 42.0
+    assert executor.stale == set()
+
+
+def test_one_stuck_probe_does_not_hold_up_the_others(executors):
+    body = Blocking()
+    executor = executors([
+        Probe('slow', body, deadline=0.05),
+        Probe('fast', lambda now: 1.0, deadline=0.05),
+        Probe('inline', lambda now: 2.0, inline=True),
+    ])
+    values = executor.run(0.0)
+    assert values['fast'] == 1.0 and values['inline'] == 2.0
+    assert executor.stale == {'slow'}
+    body.release.set()
+
+
+def test_worker_failure_keeps_last_good_value(executors):
+    executor = executors([Probe('flaky', Flaky([5.0, OSError("gone")]), deadline=1.0)])
+    assert executor.run(0.0) == {'flaky': 5.0}
+    assert executor.run(1.0) == {'flaky': 5.0}
+    assert executor.stale == {'flaky'}
+
+
+def test_inline_failure_keeps_last_good_value(executors):
+    executor = executors([Probe('cpu', Flaky([12.0, ValueError("bad /proc/stat")]), inline=True)])
+    assert executor.run(0.0) == {'cpu': 12.0}
+    assert executor.run(1.0) == {'cpu': 12.0}
+    assert executor.stale == {'cpu'}
+
+
+def test_slow_cadence_reuses_value(executors):
+    calls = []
+    executor = executors([Probe('battery', lambda now: calls.append(now) or 80.0, every=30.0, inline=True)])
+    for now in (0.0, 10.0, 29.0, 30.0, 31.0):
+        executor.run(now)
+    assert calls == [0.0, 30.0]
+
+
+def test_refresh_reports_failure():
+    probe = Probe('x', Flaky([1.0, RuntimeError()]), default=9.0)
+    assert probe.current() == 9.0
+    assert probe.refresh(0.0) is True
+    assert probe.refresh(1.0) is False
+    assert probe.current() == 1.0
@@ -0,0 +1,108 @@
+import math
+import random
+
+import pytest
+
+from streaming import Ewma, P2Quantile, StreamingStats, WindowedQuantile
+
+
+def exact_quantile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def test_ewma_starts_at_first_sample():
+    ewma = Ewma(tau=5.0)
+    assert ewma.update(42.0, 100.0) == 42.0
+
+
+def test_ewma_step_is_63_percent_through_after_tau():
+    ewma = Ewma(tau=5.0)
+    ewma.update(0.0, 0.0)
+    assert ewma.update(100.0, 5.0) == pytest.approx(100 * (1 - math.exp(-1)))
+
+
+def test_ewma_does_not_depend_on_cadence():
+    fast = Ewma(tau=5.0)
+    slow = Ewma(tau=5.0)
+    fast.update(0.0, 0.0)
+    slow.update(0.0, 0.0)
+    for i in range(1, 21):
+        fast.update(100.0, i * 0.25)
+    slow.update(100.0, 5.0)
+    assert fast.value == pytest.approx(slow.value)
+
+
+def test_ewma_ignores_clock_going_backwards():
+    ewma = Ewma(tau=5.0)
+    ewma.update(10.0, 100.0)
+    assert ewma.update(90.0, 50.0) == 10.0
+
+
+def test_p2_is_exact_for_the_first_five_samples():
+    estimator = P2Quantile(0.5)
+    assert estimator.value() is None
+    for x in (5.0, 1.0, 4.0):
+        estimator.add(x)
+    assert estimator.value() == exact_quantile([5.0, 1.0, 4.0], 0.5)
+
+
+@pytest.mark.parametrize('p', [0.5, 0.9, 0.95])
+def test_p2_tracks_quantile_of_shuffled_stream(p):
+    values = [float(i) for i in range(10000)]
+    random.Random(1).shuffle(values)
+    estimator = P2Quantile(p)
+    for x in values:
+        estimator.add(x)
+    assert estimator.value() == pytest.approx(exact_quantile(values, p), abs=100)
+
+
+def test_p2_tracks_skewed_stream():
+    rng = random.Random(2)
+    values = [rng.expovariate(1 / 20) for _ in range(20000)]
+    estimator = P2Quantile(0.95)
+    for x in values:
+        estimator.add(x)
+    assert estimator.value() == pytest.approx(exact_quantile(values, 0.95), rel=0.05)
+
+
+def test_p2_markers_stay_ordered_on_sorted_input():
+    estimator = P2Quantile(0.95)
+    for i in range(5000):
+        estimator.add(float(i))
+    assert estimator.heights == sorted(estimator.heights)
+    assert estimator.value() == pytest.approx(4750, abs=50)
+
+
+def test_p2_constant_stream():
+    estimator = P2Quantile(0.95)
+    for _ in range(1000):
+        estimator.add(7.0)
+    assert estimator.value() == 7.0
+
+
+def test_windowed_quantile_forgets_old_samples():
+    quantile = WindowedQuantile(0.95, window=200)
+    for _ in range(1000):
+        quantile.add(10.0)
+    for _ in range(200):
+        quantile.add(90.0)
+    assert quantile.value() == pytest.approx(90.0)
+
+
+def test_windowed_quantile_answers_from_at_least_half_a_window():
+    quantile = WindowedQuantile(0.95, window=200)
+    for i in range(1000):
+        quantile.add(float(i))
+        if i >= 100:
+            assert 100 <= quantile.older.count <= 200
+
+
+def test_streaming_stats_returns_smoothed_values_in_field_order():
+    stats = StreamingStats(fields=('a', 'b'), tau=5.0, window=10)
+    assert stats.update(0.0, (1.0, 2.0)) == (1.0, 2.0)
+    smoothed = stats.update(5.0, (101.0, 2.0))
+    assert smoothed[0] == pytest.approx(1 + 100 * (1 - math.exp(-1)))
+    assert smoothed[1] == 2.0
+    assert stats.ewma('a') == smoothed[0]
+    assert stats.p95('b') == 2.0
@@ -0,0 +1,93 @@
+# Limit assumed for sensors that report neither a high nor a critical point, in °C
+DEFAULT_TEMP_LIMIT = 100.0
+# Throttling by clocks: at least this hot (percent of the sensor's limit) and
+# this busy, yet running under this share of the maximum clock
+THROTTLE_HOT = 85.0
+THROTTLE_BUSY = 50.0
+THROTTLE_CLOCK = 0.7
+# ...for this many samples in a row (about a second apart), so one slow read isn't throttling
+THROTTLE_SAMPLES = 3
+# A throttling CPU is at its limit whatever the sensor reads; it never shows below this
+THROTTLED_FLOOR = 90.0
+
+
+def temperature_percent(temperature):
+    limit = temperature.critical or temperature.high or DEFAULT_TEMP_LIMIT
+    return min(max(temperature.current / limit * 100, 0.0), 100.0)
+
+
+class ThermalMonitor:
+    # Thermal headroom as a 0-100 reading: the hottest sensor against its own
+    # critical (or high) point. Throttling is a hot, busy CPU whose fastest
+    # clock stays well under its maximum, or the kernel's throttle counters
+    # going up; it turns `cause` from 'heat' into 'throttle' so the mood can
+    # say so. Idle cores parked at their minimum clock don't count: only the
+    # fastest policy is judged.
+    def __init__(self, source, cpu=None):
+        self.source = source
+        self.cpu = cpu  # collector.CpuSampler; how busy the CPU was on the last tick
+        # First read discovers the sensors (see sources.SensorIndex) and sets the counter baseline
+        self.readings = self.read()
+        self.available = self.readings is not None and bool(
+            self.readings.temperatures or self.readings.frequencies or self.readings.throttle_count is not None
+        )
+        self.throttle_count = self.readings.throttle_count if self.readings is not None else None
+        self.hottest = None
+        self.clock_ratio = None
+        self.throttled = False
+        self.slow_samples = 0
+        self.percent = 0.0
+        self.cause = 'heat'
+
+    def read(self):
+        try:
+            return self.source.sensors()
+        except (OSError, RuntimeError, AttributeError):
+            return None  # AttributeError: psutil builds without sensor support
+
+    def sample(self, now=None):
+        if not self.available:
+            return 0.0
+        readings = self.read()
+        if readings is None:
+            return self.percent
+        self.readings = readings
+
+        self.hottest = max(readings.temperatures, key=temperature_percent, default=None)
+        heat = temperature_percent(self.hottest) if self.hottest is not None else 0.0
+
+        self.clock_ratio = max(
+            (current / limit for current, limit in readings.frequencies if limit), default=None
+        )
+
+        # Counters only say something once there is a previous value to compare with
+        counted = (readings.throttle_count is not None and self.throttle_count is not None
+                   and readings.throttle_count > self.throttle_count)
+        self.throttle_count = readings.throttle_count
+        busy = self.cpu.percent if self.cpu is not None else 100.0
+        slowed = (self.clock_ratio is not None and self.clock_ratio < THROTTLE_CLOCK
+                  and heat >= THROTTLE_HOT and busy >= THROTTLE_BUSY)
+        self.slow_samples = self.slow_samples + 1 if slowed else 0
+
+        self.throttled = counted or self.slow_samples >= THROTTLE_SAMPLES
+        if self.throttled:
+            self.percent = max(heat, THROTTLED_FLOOR)
+            self.cause = 'throttle'
+        else:
+            self.percent = heat
+            self.cause = 'heat'
+        return self.percent
+
+    def as_dict(self):
+        # Per-sensor detail for collect --per-sensor
+        readings = self.readings
+        if readings is None:
+            return {}
+        detail = {
+            'temps': {entry.label: round(entry.current, 1) for entry in readings.temperatures},
+            'fans': dict(readings.fans),
+            'throttling': self.throttled,
+        }
+        if self.clock_ratio is not None:
+            detail['clock_percent'] = round(self.clock_ratio * 100, 1)
+        return detail